@@ -1,7 +1,9 @@
 import os
 import io
-import json
+import itertools
+import orjson
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from dotenv import load_dotenv
 
 # Load environment variables (needed for OpenAI/Pinecone)
@@ -11,40 +13,58 @@ load_dotenv()
 try:
     from .company_embed import (
         process_company_data_from_records,
-        parse_companies_from_csv,
+        iter_companies_from_csv,
+        parse_companies_from_json,
         get_index_details,
         clear_index,
     )
     from .company_search import (
         get_top_k_companies,
+            clear_search_caches,
         parse_filter_params,
     )
 except Exception:
     try:
         from RAG.company_embed import (
             process_company_data_from_records,
-            parse_companies_from_csv,
+            iter_companies_from_csv,
+            parse_companies_from_json,
             get_index_details,
             clear_index,
         )
         from RAG.company_search import (
             get_top_k_companies,
+            clear_search_caches,
             parse_filter_params,
         )
     except Exception:
         from company_embed import (
             process_company_data_from_records,
-            parse_companies_from_csv,
+            iter_companies_from_csv,
+            parse_companies_from_json,
             get_index_details,
             clear_index,
         )
         from company_search import (
             get_top_k_companies,
+            clear_search_caches,
             parse_filter_params,
         )
 
 
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson (used by jsonify and request.get_json)
+    """
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 
 @app.route('/', methods=['GET'])
@@ -85,16 +105,14 @@ def ingest_companies():
 
         try:
             if filename.endswith('.csv'):
-                companies = parse_companies_from_csv(uploaded)
+                # Streamed in chunks during ingest; read the first record now so
+                # malformed files are still rejected up front
+                records = iter_companies_from_csv(uploaded)
+                first = next(records, None)
+                companies = [] if first is None else itertools.chain([first], records)
             else:
                 # Assume JSON by default
-                # Some servers require reading bytes then decoding
-                try:
-                    companies = json.load(uploaded)
-                except Exception:
-                    uploaded.seek(0)
-                    raw = uploaded.read()
-                    companies = json.loads(raw.decode('utf-8'))
+                companies = parse_companies_from_json(uploaded)
         except Exception as e:
             return jsonify({'error': f'Failed to parse uploaded file: {str(e)}'}), 400
 
@@ -111,6 +129,8 @@ def ingest_companies():
             return jsonify({'error': 'No companies found in JSON body'}), 400
 
     result = process_company_data_from_records(companies, index_name=index_name)
+    # Cached search results predate the new vectors
+    clear_search_caches()
     return jsonify(result), 200
 
 
@@ -156,6 +176,7 @@ def clear_index_route():
         delete_index_flag = bool(delete_index_param)
 
     result = clear_index(index_name=index_name, delete_index=delete_index_flag)
+    clear_search_caches()
     return jsonify(result), 200
 
 
@@ -169,6 +190,7 @@ def search_companies():
       - top_k: optional (number of results, default 5)
       - index_name: optional (Pinecone index name, default 'company-information-dummy')
       - with_reasoning: optional (include reasoning, default false)
+      - infer_filters: optional (filter on industries/locations named in the query, default false)
       - industry_list: optional (comma-separated list of industries)
       - location_list: optional (comma-separated list of locations)
       - revenue_min: optional (minimum revenue, e.g., "$100M")
@@ -192,6 +214,7 @@ def search_companies():
     # Parse boolean parameter
     with_reasoning_param = request.args.get('with_reasoning', 'false').lower()
     with_reasoning = with_reasoning_param in ['true', '1', 'yes']
+    infer_filters = request.args.get('infer_filters', 'false').lower() in ['true', '1', 'yes']
     
     # Parse filter parameters
     industry_filter, location_filter, revenue_filter, employees_filter = parse_filter_params(
@@ -212,7 +235,8 @@ def search_companies():
         revenue_filter=revenue_filter,
         employees_filter=employees_filter,
         with_reasoning=with_reasoning,
-        index_name=index_name
+        index_name=index_name,
+        infer_filters=infer_filters
     )
     
     return jsonify(result), 200
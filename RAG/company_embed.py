@@ -1,20 +1,86 @@
 import os
 import json
-from typing import List, Dict, Any, Optional
+import asyncio
+import hashlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+import ijson
+import numpy as np
+import orjson
 import pandas as pd
-from openai import OpenAI
-from pinecone import Pinecone, ServerlessSpec
+try:
+    import polars as pl
+except ImportError:  # optional: faster CSV parsing when available
+    pl = None
+from openai import OpenAI, AsyncOpenAI, BadRequestError, RateLimitError, APIConnectionError, APITimeoutError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from pinecone import ServerlessSpec
+from pinecone.grpc import PineconeGRPC
 from dotenv import load_dotenv
 import time
+try:
+    from .revenue import parse_revenue
+except ImportError:
+    from revenue import parse_revenue
 
 # Load environment variables
 load_dotenv()   
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Initialize OpenAI client (the SDK retries 429s/5xx with exponential backoff)
+client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'), max_retries=5, timeout=30.0)
 
-# Initialize Pinecone client
-pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+def _async_client() -> AsyncOpenAI:
+    """
+    Create an async OpenAI client for one asyncio.run(). Its pooled connections
+    belong to the loop that opened them, so clients aren't shared across runs;
+    use it as `async with _async_client() as aclient:` so the pool is closed.
+    """
+    return AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'), max_retries=5, timeout=30.0)
+
+# Optional on-disk embedding cache keyed by content hash (enabled when EMBEDDING_CACHE_DIR is set),
+# so re-ingesting unchanged descriptions skips the OpenAI call
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+_disk_cache = diskcache.Cache(os.environ['EMBEDDING_CACHE_DIR']) if diskcache and os.getenv('EMBEDDING_CACHE_DIR') else None
+
+# text-embedding-3 models can return shortened vectors (e.g. EMBEDDING_DIMENSIONS=1024)
+# at a small recall cost; the index must be created with the same dimension
+EMBEDDING_MODEL = 'text-embedding-3-large'
+EMBEDDING_DIMENSIONS = int(os.getenv('EMBEDDING_DIMENSIONS', '3072'))
+
+# Extra attempts on top of the SDK's own retries when still rate limited or the
+# connection keeps failing; other errors (bad input, auth) are not retried
+RATE_LIMIT_ATTEMPTS = 3
+_retry_transient = retry(
+    retry=retry_if_exception_type((RateLimitError, APIConnectionError, APITimeoutError)),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    stop=stop_after_attempt(RATE_LIMIT_ATTEMPTS),
+    reraise=True,
+)
+
+# Initialize Pinecone client (gRPC data plane: protobuf-encoded vectors over HTTP/2)
+pc = PineconeGRPC(api_key=os.getenv('PINECONE_API_KEY'))
+
+# Index handles keep their connection pools alive, so reuse them across calls
+_index_cache: Dict[Tuple[str, int], Any] = {}
+
+def _get_index(name: str, pool_threads: int = 30):
+    """
+    Return a cached Pinecone Index handle for name, creating it on first use
+    """
+    key = (name, pool_threads)
+    idx = _index_cache.get(key)
+    if idx is None:
+        idx = pc.Index(name, pool_threads=pool_threads)
+        _index_cache[key] = idx
+    return idx
+
+def _evict_index(name: str) -> None:
+    for key in [k for k in _index_cache if k[0] == name]:
+        del _index_cache[key]
 
 def create_company_description(company):
     """
@@ -22,35 +88,240 @@ def create_company_description(company):
     """
     basic_info = company['basic_info']
     deal_analysis = company['deal_analysis']
-    
-    description = f"""
-    Company: {company['company_name']}
-    Industry: {basic_info['industry']}
-    Headquarters: {basic_info['headquarters']}
-    Revenue: {basic_info['revenue']}
-    Employees: {basic_info['employees']}
-    Business Model: {deal_analysis['business_model']}
-    Strategic Priorities: {', '.join(deal_analysis['strategic_priorities'])}
-    Ideal Operating Partner Profile:
-    - Industry: {deal_analysis['ideal_op_profile']['industry']}
-    - Functional Strengths: {', '.join(deal_analysis['ideal_op_profile']['functional'])}
-    - Leadership Qualities: {', '.join(deal_analysis['ideal_op_profile']['leadership'])}
-    """
-    return description.strip()
+    op_profile = deal_analysis['ideal_op_profile']
+
+    # Built with a single join; the layout (including the 4-space indent) must stay
+    # byte-identical because vector ids are hashes of this text
+    parts = (
+        'Company: ', str(company['company_name']),
+        '\n    Industry: ', str(basic_info['industry']),
+        '\n    Headquarters: ', str(basic_info['headquarters']),
+        '\n    Revenue: ', str(basic_info['revenue']),
+        '\n    Employees: ', str(basic_info['employees']),
+        '\n    Business Model: ', str(deal_analysis['business_model']),
+        '\n    Strategic Priorities: ', ', '.join(deal_analysis['strategic_priorities']),
+        '\n    Ideal Operating Partner Profile:',
+        '\n    - Industry: ', str(op_profile['industry']),
+        '\n    - Functional Strengths: ', ', '.join(op_profile['functional']),
+        '\n    - Leadership Qualities: ', ', '.join(op_profile['leadership']),
+    )
+    return ''.join(parts).strip()
+
+def description_id(description: str) -> str:
+    """
+    Stable vector id derived from the description text, so re-ingesting the
+    same company overwrites its vector instead of duplicating it
+    """
+    return hashlib.blake2b(description.encode('utf-8'), digest_size=16).hexdigest()
 
 def generate_embedding(text):
     """
-    Generate embedding using OpenAI's text-embedding-3-large model
+    Generate embedding using OpenAI's text-embedding-3-large model.
+    Transient failures are retried with backoff; anything else is raised.
+    """
+    cached = _cached_embedding(text)
+    if cached is not None:
+        return cached
+    embedding = _create_embedding(text)
+    _cache_embedding(text, embedding)
+    return embedding
+
+@_retry_transient
+def _create_embedding(text: str) -> List[float]:
+    response = client.embeddings.create(
+        input=text,
+        model=EMBEDDING_MODEL,
+        dimensions=EMBEDDING_DIMENSIONS
+    )
+    return response.data[0].embedding
+
+def _embedding_cache_key(text: str) -> str:
+    return 'doc:' + hashlib.blake2b(f"{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONS}:{text}".encode('utf-8'), digest_size=16).hexdigest()
+
+def _cached_embedding(text: str) -> Optional[List[float]]:
+    """
+    Return the disk-cached embedding for text, or None when missing or caching is off
     """
+    if _disk_cache is None:
+        return None
     try:
-        response = client.embeddings.create(
-            input=text,
-            model='text-embedding-3-large'
-        )
-        return response.data[0].embedding
+        cached = _disk_cache.get(_embedding_cache_key(text))
     except Exception as e:
-        print(f"Error generating embedding: {e}")
+        print(f"Disk cache read failed: {e}")
         return None
+    return None if cached is None else np.frombuffer(cached, dtype=np.float16).astype(np.float32).tolist()
+
+def _cache_embedding(text: str, embedding: Optional[List[float]]) -> None:
+    if _disk_cache is None or embedding is None:
+        return
+    try:
+        _disk_cache.set(_embedding_cache_key(text), np.asarray(embedding, dtype=np.float16).tobytes())
+    except Exception as e:
+        print(f"Disk cache write failed: {e}")
+
+async def _embed_chunk(aclient: AsyncOpenAI, texts: List[str], sem: asyncio.Semaphore) -> List[Optional[List[float]]]:
+    """
+    Embed one batch of texts, holding the semaphore for the duration of the request.
+    Texts already in the disk cache are served from it and left out of the request.
+    """
+    embeddings = [_cached_embedding(t) for t in texts]
+    missing = [i for i, e in enumerate(embeddings) if e is None]
+    if missing:
+        fresh = await _request_embeddings(aclient, [texts[i] for i in missing], sem)
+        for i, embedding in zip(missing, fresh):
+            embeddings[i] = embedding
+            _cache_embedding(texts[i], embedding)
+    return embeddings
+
+async def _request_embeddings(aclient: AsyncOpenAI, texts: List[str], sem: asyncio.Semaphore) -> List[Optional[List[float]]]:
+    # A failed batch yields Nones so the other batches of the ingest still go through
+    async with sem:
+        try:
+            return await _create_embeddings_async(aclient, texts)
+        except BadRequestError as e:
+            if len(texts) == 1:
+                print(f"Error generating embedding: {e}")
+                return [None]
+            error = e
+        except Exception as e:
+            print(f"Error generating embeddings for batch of {len(texts)}: {e}")
+            return [None] * len(texts)
+    # One bad input rejects the whole request; split the batch (outside the semaphore)
+    # until it is isolated so the rest of the batch is still embedded
+    print(f"Splitting batch of {len(texts)} after bad request: {error}")
+    mid = len(texts) // 2
+    halves = await asyncio.gather(
+        _request_embeddings(aclient, texts[:mid], sem),
+        _request_embeddings(aclient, texts[mid:], sem),
+    )
+    return halves[0] + halves[1]
+
+@_retry_transient
+async def _create_embeddings_async(aclient: AsyncOpenAI, texts: List[str]) -> List[List[float]]:
+    response = await aclient.embeddings.create(
+        input=texts,
+        model=EMBEDDING_MODEL,
+        dimensions=EMBEDDING_DIMENSIONS
+    )
+    return [d.embedding for d in response.data]
+
+def _length_sorted_batches(texts: List[str], batch_size: int, max_batch_tokens: int) -> List[List[int]]:
+    """
+    Group text positions into batches of similar length.
+
+    Texts are ordered by length so short and long descriptions don't share a
+    request, and each batch is capped both by count and by an estimated token
+    budget (~4 characters per token) to stay under the embeddings request limit.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i in order:
+        tokens = len(texts[i]) // 4 + 1
+        if current and (len(current) >= batch_size or current_tokens + tokens > max_batch_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+async def _generate_embeddings_async(texts: List[str], batch_size: int, max_concurrency: int, max_batch_tokens: int) -> List[Optional[List[float]]]:
+    sem = asyncio.Semaphore(max_concurrency)
+    batches = _length_sorted_batches(texts, batch_size, max_batch_tokens)
+    async with _async_client() as aclient:
+        tasks = [_embed_chunk(aclient, [texts[i] for i in batch], sem) for batch in batches]
+        embeddings_chunks = await asyncio.gather(*tasks)
+
+    # Scatter results back to the caller's original order
+    result: List[Optional[List[float]]] = [None] * len(texts)
+    for batch, chunk in zip(batches, embeddings_chunks):
+        for i, embedding in zip(batch, chunk):
+            result[i] = embedding
+    return result
+
+def generate_embeddings_batch(texts: List[str], batch_size: int = 128, max_concurrency: int = 16, max_batch_tokens: int = 200_000) -> List[Optional[List[float]]]:
+    """
+    Generate embeddings for many texts, sending up to batch_size inputs per request.
+
+    Texts are batched by length, and batches are sent concurrently (at most
+    max_concurrency in flight). Results are returned in the same order as texts.
+    If a batch fails, its entries are None so callers can skip them without
+    losing the other batches.
+    """
+    if not texts:
+        return []
+    return asyncio.run(_generate_embeddings_async(texts, batch_size, max_concurrency, max_batch_tokens))
+
+def _index_ready(index_name: str) -> bool:
+    status = pc.describe_index(index_name).status
+    if isinstance(status, dict):
+        return bool(status.get('ready'))
+    return bool(getattr(status, 'ready', False))
+
+def wait_for_index_ready(index_name: str, timeout: float = 60.0, interval: float = 1.0) -> bool:
+    """
+    Poll describe_index until the index reports ready or timeout seconds pass.
+    Returns whether the index became ready.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if _index_ready(index_name):
+                return True
+        except Exception as e:
+            print(f"  ⚠️ Could not check index status: {e}")
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+def generate_embeddings_batch_api(texts: List[str], poll_interval: float = 30.0, completion_window: str = '24h') -> List[Optional[List[float]]]:
+    """
+    Generate embeddings through the OpenAI Batch API.
+
+    Intended for offline bulk ingests: the job is billed at roughly half the
+    real-time price but may take up to completion_window to finish. Blocks,
+    polling every poll_interval seconds. Results are returned in the same order
+    as texts, with None for any request that failed.
+    """
+    lines = [
+        orjson.dumps({
+            'custom_id': str(i),
+            'method': 'POST',
+            'url': '/v1/embeddings',
+            'body': {'model': EMBEDDING_MODEL, 'dimensions': EMBEDDING_DIMENSIONS, 'input': text}
+        })
+        for i, text in enumerate(texts)
+    ]
+    input_file = client.files.create(file=('batch.jsonl', b'\n'.join(lines)), purpose='batch')
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint='/v1/embeddings',
+        completion_window=completion_window
+    )
+    print(f"Submitted embedding batch {batch.id} ({len(texts)} requests)")
+
+    while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+        print(f"  Batch {batch.id}: {batch.status}")
+
+    embeddings: List[Optional[List[float]]] = [None] * len(texts)
+    if batch.status != 'completed' or not batch.output_file_id:
+        print(f"❌ Embedding batch {batch.id} ended with status {batch.status}")
+        return embeddings
+
+    output = client.files.content(batch.output_file_id).read()
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        record = orjson.loads(line)
+        response = record.get('response') or {}
+        if response.get('status_code') == 200:
+            embeddings[int(record['custom_id'])] = response['body']['data'][0]['embedding']
+    return embeddings
 
 def create_pinecone_index(index_name='company-information-dummy'):
     """
@@ -59,10 +330,10 @@ def create_pinecone_index(index_name='company-information-dummy'):
     print(f"Creating Pinecone index: {index_name}")
     
     # Check if the index already exists
-    if index_name not in pc.list_indexes().names():
+    if not pc.has_index(index_name):
         pc.create_index(
             name=index_name,
-            dimension=3072,  # Dimension for text-embedding-3-large
+            dimension=EMBEDDING_DIMENSIONS,  # Must match the embedding size requested from OpenAI
             metric='cosine',
             spec=ServerlessSpec(
                 cloud='aws',
@@ -73,17 +344,172 @@ def create_pinecone_index(index_name='company-information-dummy'):
         
         # Wait for index to be ready
         print("Waiting for index to be ready...")
-        time.sleep(30)
+        if wait_for_index_ready(index_name):
+            print(f"✅ Index {index_name} is ready")
+        else:
+            print(f"⚠️ Index {index_name} not ready after 60s, continuing anyway")
     else:
         print(f"✅ Index {index_name} already exists")
     
     # Connect to the index
-    index = pc.Index(index_name)
+    index = _get_index(index_name)
     return index
 
-def process_company_data(json_file='dummy_companies.json', index_name: str = 'company-information-dummy'):
+def _chunks(iterable: Iterable[Any], n: int) -> Iterator[Tuple[Any, ...]]:
+    """
+    Yield successive n-sized tuples from iterable
+    """
+    it = iter(iterable)
+    chunk = tuple(itertools.islice(it, n))
+    while chunk:
+        yield chunk
+        chunk = tuple(itertools.islice(it, n))
+
+def upsert_vectors(index_name: str, vectors: List[Dict[str, Any]], batch_size: int = 100, pool_threads: int = 30) -> None:
+    """
+    Upsert vectors in batch_size chunks, sending the chunks in parallel over a
+    pool of pool_threads connections. Raises if any chunk fails.
+    """
+    _upsert_chunks(_get_index(index_name, pool_threads), vectors, batch_size)
+
+def _as_upsert_payload(vector: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Expand float16 values held in memory back to float32 lists for Pinecone
+    """
+    values = vector['values']
+    if isinstance(values, np.ndarray):
+        return {**vector, 'values': values.astype(np.float32).tolist()}
+    return vector
+
+def _upsert_chunks(index, vectors: List[Dict[str, Any]], batch_size: int) -> None:
+    async_results = [
+        index.upsert(vectors=[_as_upsert_payload(v) for v in chunk], async_req=True)
+        for chunk in _chunks(vectors, batch_size)
+    ]
+    for r in async_results:
+        r.result()
+
+def _fetch_existing_ids(index, ids: List[str], batch_size: int = 100, max_workers: int = 8) -> set:
+    """
+    Return the subset of ids that already have a vector stored in the index.
+    Fetches of batch_size ids each are issued concurrently.
+    """
+    def fetch_ids(chunk):
+        try:
+            fetched = index.fetch(ids=list(chunk))
+        except Exception as e:
+            print(f"  ⚠️ Could not check existing vectors: {e}")
+            return ()
+        vectors = fetched.get('vectors', {}) if isinstance(fetched, dict) else getattr(fetched, 'vectors', {})
+        return vectors.keys()
+
+    chunks = list(_chunks(ids, batch_size))
+    if not chunks:
+        return set()
+    existing = set()
+    with ThreadPoolExecutor(max_workers=min(len(chunks), max_workers)) as executor:
+        for found in executor.map(fetch_ids, chunks):
+            existing.update(found)
+    return existing
+
+def _build_vector_record(vector_id: str, company: Dict[str, Any], embedding: Any) -> Dict[str, Any]:
+    """
+    Build the Pinecone vector for a company, with basic_info and deal_analysis
+    fields flattened into metadata for filtering and display
+    """
+    bi = company['basic_info']
+    da = company['deal_analysis']
+    op = da['ideal_op_profile']
+    metadata = {
+        'company_name': company['company_name'],
+        'industry': bi['industry'],
+        'headquarters': bi['headquarters'],
+        'revenue': bi['revenue'],
+        'employees': bi['employees'],
+        'business_model': da['business_model'],
+        'strategic_priorities': da['strategic_priorities'],
+        'ideal_op_industry': op['industry'],
+        'ideal_op_functional': op['functional'],
+        'ideal_op_leadership': op['leadership']
+    }
+    # Unparseable revenues ("N/A") are left out so range filters don't match them
+    revenue_numeric = parse_revenue(bi['revenue'])
+    if revenue_numeric is not None:
+        metadata['revenue_numeric'] = revenue_numeric
+    return {
+        'id': vector_id,
+        'values': embedding,
+        'metadata': metadata
+    }
+
+async def _embed_and_upsert(
+    pending: List[Tuple[str, Dict[str, Any]]],
+    index,
+    batch_size: int,
+    max_concurrency: int,
+    upsert_batch_size: int,
+    max_batch_tokens: int = 200_000,
+    queue_size: int = 4,
+) -> Dict[str, Any]:
+    """
+    Embed and upsert (vector_id, company) pairs as a producer-consumer pipeline.
+
+    Embedding batches run concurrently and push their vectors onto a bounded
+    queue; a single consumer upserts each batch as soon as it arrives, so
+    Pinecone writes overlap with the remaining OpenAI calls. The bounded queue
+    keeps embeddings from racing too far ahead of upsert bandwidth.
+    """
+    sem = asyncio.Semaphore(max_concurrency)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    descriptions = [company['description'] for _, company in pending]
+    batches = _length_sorted_batches(descriptions, batch_size, max_batch_tokens)
+    stats: Dict[str, Any] = {'upserted_count': 0, 'failed_count': 0}
+
+    async def produce(batch: List[int]) -> None:
+        embeddings = await _embed_chunk(aclient, [descriptions[i] for i in batch], sem)
+        vectors = []
+        for i, embedding in zip(batch, embeddings):
+            vector_id, company = pending[i]
+            if not embedding:
+                print(f"  ❌ Failed to generate embedding for {company.get('company_name', 'UNKNOWN')}")
+                stats['failed_count'] += 1
+                continue
+            # Queued batches hold float16 values; they're widened again at upsert time
+            embedding = np.asarray(embedding, dtype=np.float16)
+            vectors.append(_build_vector_record(vector_id, company, embedding))
+        if vectors:
+            await queue.put(vectors)
+
+    async def produce_all() -> None:
+        await asyncio.gather(*[produce(batch) for batch in batches])
+        await queue.put(None)
+
+    async def consume() -> None:
+        while True:
+            vectors = await queue.get()
+            if vectors is None:
+                break
+            # Keep draining after a failure so producers never block on a full queue
+            if 'error' in stats:
+                continue
+            try:
+                await asyncio.to_thread(_upsert_chunks, index, vectors, upsert_batch_size)
+                stats['upserted_count'] += len(vectors)
+                print(f"  ✅ Upserted {len(vectors)} vectors ({stats['upserted_count']} total)")
+            except Exception as e:
+                print(f"❌ Error upserting vectors: {e}")
+                stats['error'] = str(e)
+
+    async with _async_client() as aclient:
+        await asyncio.gather(produce_all(), consume())
+    return stats
+
+def process_company_data(json_file='dummy_companies.json', index_name: str = 'company-information-dummy', batch_size: int = 256, max_concurrency: int = 8, upsert_batch_size: int = 100, pool_threads: int = 30, use_batch_api: bool = False):
     """
     Main function to process JSON file and create embeddings
+
+    With use_batch_api=True, embeddings are generated through the OpenAI Batch
+    API (cheaper, but completes asynchronously within 24h) before upserting.
     """
     print("="*60)
     print("PROCESSING COMPANY DATA")
@@ -100,60 +526,45 @@ def process_company_data(json_file='dummy_companies.json', index_name: str = 'co
     for company in companies:
         company['description'] = create_company_description(company)
     
-    # Create Pinecone index
-    index = create_pinecone_index(index_name=index_name)
-    
-    # Generate embeddings and prepare data for upsert
-    print("Generating embeddings and preparing data...")
-    vectors = []
-    
-    for idx, company in enumerate(companies):
-        print(f"Processing company {idx + 1}/{len(companies)}: {company['company_name']}")
-        
-        # Generate embedding
-        embedding = generate_embedding(company['description'])
-        
-        if embedding:
-            # Prepare vector data with basic_info as metadata for filtering
-            vector_data = {
-                'id': str(idx),
-                'values': embedding,
-                'metadata': {
-                    'company_name': company['company_name'],
-                    'industry': company['basic_info']['industry'],
-                    'headquarters': company['basic_info']['headquarters'],
-                    'revenue': company['basic_info']['revenue'],
-                    'employees': company['basic_info']['employees'],
-                    'business_model': company['deal_analysis']['business_model'],
-                    'strategic_priorities': company['deal_analysis']['strategic_priorities'],
-                    'ideal_op_industry': company['deal_analysis']['ideal_op_profile']['industry'],
-                    'ideal_op_functional': company['deal_analysis']['ideal_op_profile']['functional'],
-                    'ideal_op_leadership': company['deal_analysis']['ideal_op_profile']['leadership'],
-                    'description': company['description']
-                }
-            }
-            vectors.append(vector_data)
-            print(f"  ✅ Generated embedding for {company['company_name']}")
-        else:
-            print(f"  ❌ Failed to generate embedding for {company['company_name']}")
-        
-        # Add small delay to avoid rate limits
-        time.sleep(0.15)
+    if use_batch_api:
+        create_pinecone_index(index_name=index_name)
+        embeddings = generate_embeddings_batch_api([company['description'] for company in companies])
+        vectors = [
+            _build_vector_record(description_id(company['description']), company, embedding)
+            for company, embedding in zip(companies, embeddings)
+            if embedding
+        ]
+        print(f"\nUpserting {len(vectors)} vectors into Pinecone...")
+        try:
+            upsert_vectors(index_name, vectors, batch_size=upsert_batch_size, pool_threads=pool_threads)
+            print(f"✅ Successfully stored {len(vectors)} vectors in Pinecone!")
+        except Exception as e:
+            print(f"❌ Error upserting vectors: {e}")
+            return None
+        return _get_index(index_name, pool_threads)
     
-    # Upsert vectors into Pinecone
-    print(f"\nUpserting {len(vectors)} vectors into Pinecone...")
-    try:
-        index.upsert(vectors=vectors)
-        print(f"✅ Successfully stored {len(vectors)} vectors in Pinecone!")
-    except Exception as e:
-        print(f"❌ Error upserting vectors: {e}")
+    # Embed concurrently and upsert through the same pipeline as API ingests
+    result = process_company_data_from_records(
+        companies,
+        index_name=index_name,
+        batch_size=batch_size,
+        max_concurrency=max_concurrency,
+        upsert_batch_size=upsert_batch_size,
+        pool_threads=pool_threads
+    )
+    if 'error' in result:
         return None
     
-    return index
+    return _get_index(index_name, pool_threads)
 
-def process_company_data_from_records(companies: List[Dict[str, Any]], index_name: str = 'company-information-dummy') -> Dict[str, Any]:
+def process_company_data_from_records(companies: Iterable[Dict[str, Any]], index_name: str = 'company-information-dummy', batch_size: int = 128, max_concurrency: int = 16, upsert_batch_size: int = 100, pool_threads: int = 30, chunk_size: int = 5000) -> Dict[str, Any]:
     """
-    Ingest a list of company records into Pinecone.
+    Ingest company records into Pinecone.
+
+    companies may be a list or a lazy iterator (e.g. iter_companies_from_csv);
+    records are consumed chunk_size at a time and each chunk is embedded and
+    upserted before the next is read, so memory stays bounded by the chunk and
+    a failure part-way through keeps the chunks already stored.
 
     Each record should include keys compatible with create_company_description:
     {
@@ -174,58 +585,224 @@ def process_company_data_from_records(companies: List[Dict[str, Any]], index_nam
     print("INGESTING COMPANY RECORDS")
     print("="*60)
 
-    # Build descriptions if missing
-    for company in companies:
-        if 'description' not in company or not company['description']:
-            company['description'] = create_company_description(company)
-
     index = create_pinecone_index(index_name=index_name)
 
-    print("Generating embeddings and preparing data...")
-    vectors: List[Dict[str, Any]] = []
-
-    for idx, company in enumerate(companies):
-        print(f"Processing company {idx + 1}/{len(companies)}: {company.get('company_name', 'UNKNOWN')}")
-
-        embedding = generate_embedding(company['description'])
-        if embedding:
-            vector_data = {
-                'id': str(idx),
-                'values': embedding,
-                'metadata': {
-                    'company_name': company['company_name'],
-                    'industry': company['basic_info']['industry'],
-                    'headquarters': company['basic_info']['headquarters'],
-                    'revenue': company['basic_info']['revenue'],
-                    'employees': company['basic_info']['employees'],
-                    'business_model': company['deal_analysis']['business_model'],
-                    'strategic_priorities': company['deal_analysis']['strategic_priorities'],
-                    'ideal_op_industry': company['deal_analysis']['ideal_op_profile']['industry'],
-                    'ideal_op_functional': company['deal_analysis']['ideal_op_profile']['functional'],
-                    'ideal_op_leadership': company['deal_analysis']['ideal_op_profile']['leadership'],
-                    'description': company['description']
-                }
+    # Ids stored (or queued) so far, so repeats across chunks are skipped too
+    seen = set()
+    upserted_count = 0
+    skipped_count = 0
+    failed_count = 0
+    chunks = _chunks(companies, chunk_size)
+    while True:
+        # Lazy sources (e.g. a streamed CSV) can fail part-way; report it like an upsert failure
+        try:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            # Build descriptions if missing
+            for company in chunk:
+                if 'description' not in company or not company['description']:
+                    company['description'] = create_company_description(company)
+        except Exception as e:
+            print(f"❌ Error reading company records: {e}")
+            return {
+                'index_name': index_name,
+                'error': f"Failed to read company records: {e}",
+                'upserted_count': upserted_count,
+                'failed_count': failed_count
+            }
+
+        # Skip companies whose description is already stored (or repeated in this ingest)
+        ids = [description_id(c['description']) for c in chunk]
+        seen |= _fetch_existing_ids(index, [i for i in ids if i not in seen])
+        pending = []
+        for vector_id, company in zip(ids, chunk):
+            if vector_id in seen:
+                continue
+            seen.add(vector_id)
+            pending.append((vector_id, company))
+        if len(chunk) > len(pending):
+            print(f"Skipping {len(chunk) - len(pending)} companies already present in the index")
+        skipped_count += len(chunk) - len(pending)
+
+        print(f"Embedding and upserting {len(pending)} companies into Pinecone (index: {index_name})...")
+        try:
+            stats = asyncio.run(_embed_and_upsert(
+                pending,
+                _get_index(index_name, pool_threads),
+                batch_size=batch_size,
+                max_concurrency=max_concurrency,
+                upsert_batch_size=upsert_batch_size,
+            ))
+        except Exception as e:
+            print(f"❌ Error ingesting vectors: {e}")
+            return {
+                'index_name': index_name,
+                'error': str(e),
+                'upserted_count': upserted_count,
+                'failed_count': failed_count
+            }
+
+        upserted_count += stats['upserted_count']
+        failed_count += stats['failed_count']
+        if 'error' in stats:
+            return {
+                'index_name': index_name,
+                'error': stats['error'],
+                'upserted_count': upserted_count,
+                'failed_count': failed_count
             }
-            vectors.append(vector_data)
-            print(f"  ✅ Generated embedding for {company['company_name']}")
+
+    print(f"✅ Successfully stored {upserted_count} vectors in Pinecone!")
+    if failed_count:
+        print(f"⚠️ {failed_count} companies could not be embedded and were not stored")
+    return {
+        'index_name': index_name,
+        'upserted_count': upserted_count,
+        'skipped_count': skipped_count,
+        'failed_count': failed_count
+    }
+
+_CSV_REQUIRED_COLUMNS = [
+    'company_name', 'industry', 'headquarters', 'revenue', 'employees',
+    'business_model', 'strategic_priorities', 'ideal_op_industry',
+    'ideal_op_functional', 'ideal_op_leadership'
+]
+
+# Comma-separated cells that become lists in the company record
+_CSV_LIST_COLUMNS = ['strategic_priorities', 'ideal_op_functional', 'ideal_op_leadership']
+
+# Explicit column types so the reader skips per-chunk type inference; text columns
+# stay verbatim (e.g. a revenue of "1.50" is not re-rendered as 1.5)
+_CSV_DTYPES = {col: 'Int64' if col == 'employees' else str for col in _CSV_REQUIRED_COLUMNS}
+
+def _split_list_column(series: pd.Series) -> pd.Series:
+    """
+    Split a comma-separated column into lists of stripped, non-empty values
+    """
+    parts = series.fillna('').astype(str).str.strip().str.split(r'\s*,\s*', regex=True)
+    return parts.map(lambda xs: [x for x in xs if x])
+
+# (label, column) pairs in create_company_description's layout; list columns are joined with ', '
+_CSV_DESCRIPTION_LAYOUT = [
+    ('Company: ', 'company_name'),
+    ('\n    Industry: ', 'industry'),
+    ('\n    Headquarters: ', 'headquarters'),
+    ('\n    Revenue: ', 'revenue'),
+    ('\n    Employees: ', 'employees'),
+    ('\n    Business Model: ', 'business_model'),
+    ('\n    Strategic Priorities: ', 'strategic_priorities'),
+    ('\n    Ideal Operating Partner Profile:\n    - Industry: ', 'ideal_op_industry'),
+    ('\n    - Functional Strengths: ', 'ideal_op_functional'),
+    ('\n    - Leadership Qualities: ', 'ideal_op_leadership'),
+]
+
+def _describe_pandas_chunk(chunk: pd.DataFrame) -> pd.Series:
+    """
+    Build create_company_description's text for a whole chunk with column-wise
+    string concatenation instead of a Python call per row
+    """
+    description = pd.Series('', index=chunk.index, dtype=object)
+    for label, col in _CSV_DESCRIPTION_LAYOUT:
+        if col in _CSV_LIST_COLUMNS:
+            values = chunk[col].str.join(', ')
+        elif col == 'employees':
+            values = chunk[col].fillna(0).astype('int64').astype(str)
         else:
-            print(f"  ❌ Failed to generate embedding for {company.get('company_name', 'UNKNOWN')}")
-        time.sleep(0.15)
+            values = chunk[col].astype(object).map(str)
+        description = description + label + values.astype(object)
+    return description.str.rstrip()
 
-    print(f"\nUpserting {len(vectors)} vectors into Pinecone (index: {index_name})...")
-    try:
-        index.upsert(vectors=vectors)
-        print(f"✅ Successfully stored {len(vectors)} vectors in Pinecone!")
-        return {
-            'index_name': index_name,
-            'upserted_count': len(vectors)
-        }
-    except Exception as e:
-        print(f"❌ Error upserting vectors: {e}")
-        return {
-            'index_name': index_name,
-            'error': str(e)
+def _describe_polars_frame():
+    """Polars expression equivalent of _describe_pandas_chunk"""
+    exprs = []
+    for label, col in _CSV_DESCRIPTION_LAYOUT:
+        if col in _CSV_LIST_COLUMNS:
+            value = pl.col(col).list.join(', ')
+        elif col == 'employees':
+            value = pl.col(col).fill_null(0).cast(pl.Utf8)
+        else:
+            value = pl.col(col).cast(pl.Utf8).fill_null('None')
+        exprs.extend([pl.lit(label), value])
+    return pl.concat_str(exprs).str.strip_chars_end().alias('description')
+
+def _company_from_csv_record(rec: Dict[str, Any]) -> Dict[str, Any]:
+    employees = rec['employees']
+    return {
+        'description': rec['description'],
+        'company_name': rec['company_name'],
+        'basic_info': {
+            'industry': rec['industry'],
+            'headquarters': rec['headquarters'],
+            'revenue': rec['revenue'],
+            'employees': int(employees) if employees is not None and not pd.isna(employees) else 0,
+        },
+        'deal_analysis': {
+            'business_model': rec['business_model'],
+            'strategic_priorities': rec['strategic_priorities'],
+            'ideal_op_profile': {
+                'industry': rec['ideal_op_industry'],
+                'functional': rec['ideal_op_functional'],
+                'leadership': rec['ideal_op_leadership']
+            }
         }
+    }
+
+def _iter_companies_polars(file_like) -> Iterator[Dict[str, Any]]:
+    # Everything is read as text (like the pandas path's dtype map) so values such as
+    # revenue "1.50" stay verbatim; only employees is cast
+    df = pl.read_csv(file_like, infer_schema_length=0)
+    missing = [c for c in _CSV_REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required CSV columns: {missing}")
+
+    df = df.select(_CSV_REQUIRED_COLUMNS).with_columns(
+        pl.col('employees').cast(pl.Int64),
+        *[
+            pl.col(c).cast(pl.Utf8).fill_null('').str.split(',')
+            .list.eval(pl.element().str.strip_chars())
+            .list.eval(pl.element().filter(pl.element() != ''))
+            for c in _CSV_LIST_COLUMNS
+        ]
+    ).with_columns(_describe_polars_frame())
+    for rec in df.iter_rows(named=True):
+        yield _company_from_csv_record(rec)
+
+def _iter_companies_pandas(file_like, chunksize: int) -> Iterator[Dict[str, Any]]:
+    reader = pd.read_csv(
+        file_like,
+        chunksize=chunksize,
+        usecols=lambda c: c in _CSV_REQUIRED_COLUMNS,
+        dtype=_CSV_DTYPES
+    )
+
+    for chunk in reader:
+        missing = [c for c in _CSV_REQUIRED_COLUMNS if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"Missing required CSV columns: {missing}")
+
+        # Empty text cells become None, as in the polars path and JSON records
+        text_columns = [c for c in _CSV_REQUIRED_COLUMNS if c != 'employees' and c not in _CSV_LIST_COLUMNS]
+        chunk[text_columns] = chunk[text_columns].astype(object).where(chunk[text_columns].notna(), None)
+        for col in _CSV_LIST_COLUMNS:
+            chunk[col] = _split_list_column(chunk[col])
+        chunk['description'] = _describe_pandas_chunk(chunk)
+
+        for rec in chunk.to_dict(orient='records'):
+            yield _company_from_csv_record(rec)
+
+def iter_companies_from_csv(file_like, chunksize: int = 10_000) -> Iterator[Dict[str, Any]]:
+    """
+    Stream a CSV file-like object as company records.
+
+    Uses polars' multithreaded reader when it is installed, otherwise pandas
+    reading chunksize rows at a time. Yields dicts in the structure expected by
+    create_company_description, with 'description' already filled in column-wise.
+    Raises ValueError if any required column is missing.
+    """
+    if pl is not None:
+        return _iter_companies_polars(file_like)
+    return _iter_companies_pandas(file_like, chunksize)
 
 def parse_companies_from_csv(file_like) -> List[Dict[str, Any]]:
     """
@@ -236,46 +813,45 @@ def parse_companies_from_csv(file_like) -> List[Dict[str, Any]]:
       business_model, strategic_priorities, ideal_op_industry,
       ideal_op_functional, ideal_op_leadership
     """
-    df = pd.read_csv(file_like)
+    return list(iter_companies_from_csv(file_like))
 
-    required = [
-        'company_name', 'industry', 'headquarters', 'revenue', 'employees',
-        'business_model', 'strategic_priorities', 'ideal_op_industry',
-        'ideal_op_functional', 'ideal_op_leadership'
-    ]
-    missing = [c for c in required if c not in df.columns]
-    if missing:
-        raise ValueError(f"Missing required CSV columns: {missing}")
+# Uploads smaller than this are parsed in one shot; larger ones are streamed
+_JSON_STREAM_THRESHOLD = 1024 * 1024
 
-    def to_list(value: Any) -> List[str]:
-        if isinstance(value, list):
-            return value
-        if pd.isna(value):
-            return []
-        return [s.strip() for s in str(value).split(',') if s.strip()]
-
-    companies: List[Dict[str, Any]] = []
-    for _, row in df.iterrows():
-        companies.append({
-            'company_name': row['company_name'],
-            'basic_info': {
-                'industry': row['industry'],
-                'headquarters': row['headquarters'],
-                'revenue': row['revenue'],
-                'employees': int(row['employees']) if not pd.isna(row['employees']) else 0,
-            },
-            'deal_analysis': {
-                'business_model': row['business_model'],
-                'strategic_priorities': to_list(row['strategic_priorities']),
-                'ideal_op_profile': {
-                    'industry': row['ideal_op_industry'],
-                    'functional': to_list(row['ideal_op_functional']),
-                    'leadership': to_list(row['ideal_op_leadership'])
-                }
-            }
-        })
+def iter_companies_from_json(file_like) -> Iterator[Dict[str, Any]]:
+    """
+    Stream company records from a binary JSON file-like object.
+
+    Accepts either a top-level list of companies or an object with a
+    'companies' list. Records are yielded one at a time, so the raw document
+    is never held in memory as a whole.
+    """
+    first = file_like.read(1)
+    while first and first.isspace():
+        first = file_like.read(1)
+    file_like.seek(0)
+
+    prefix = 'item' if first == b'[' else 'companies.item'
+    yield from ijson.items(file_like, prefix, use_float=True)
+
+def parse_companies_from_json(file_like) -> List[Dict[str, Any]]:
+    """
+    Parse a binary JSON file-like object into the companies list structure.
 
-    return companies
+    Small payloads are decoded in one orjson call; anything over
+    _JSON_STREAM_THRESHOLD bytes is streamed with ijson.
+    """
+    file_like.seek(0, os.SEEK_END)
+    size = file_like.tell()
+    file_like.seek(0)
+
+    if size < _JSON_STREAM_THRESHOLD:
+        data = orjson.loads(file_like.read())
+        if isinstance(data, dict):
+            return data.get('companies') or []
+        return data
+
+    return list(iter_companies_from_json(file_like))
 
 def get_index_details(index_name: str = 'company-information-dummy', sample_limit: int = 1) -> Dict[str, Any]:
     """
@@ -288,7 +864,7 @@ def get_index_details(index_name: str = 'company-information-dummy', sample_limi
     """
     details: Dict[str, Any] = {'index_name': index_name}
     try:
-        index = pc.Index(index_name)
+        index = _get_index(index_name)
         stats = index.describe_index_stats()
         details['stats'] = {
             'total_vector_count': stats.get('total_vector_count', 0),
@@ -320,11 +896,11 @@ def get_index_details(index_name: str = 'company-information-dummy', sample_limi
 
         if ids:
             fetched = index.fetch(ids=ids if isinstance(ids, list) else list(ids))
-            vectors = fetched.get('vectors', {}) if isinstance(fetched, dict) else {}
+            vectors = fetched.get('vectors', {}) if isinstance(fetched, dict) else getattr(fetched, 'vectors', {})
             if vectors:
                 first_id = next(iter(vectors.keys()))
                 vec = vectors[first_id]
-                sample_meta = vec.get('metadata') if isinstance(vec, dict) else None
+                sample_meta = vec.get('metadata') if isinstance(vec, dict) else getattr(vec, 'metadata', None)
 
         if not sample_meta:
             # Fallback to schema we ingest if we cannot fetch
@@ -333,13 +909,13 @@ def get_index_details(index_name: str = 'company-information-dummy', sample_limi
                 'industry': 'string',
                 'headquarters': 'string',
                 'revenue': 'string',
+                'revenue_numeric': 'float',
                 'employees': 'int',
                 'business_model': 'string',
                 'strategic_priorities': ['string'],
                 'ideal_op_industry': 'string',
                 'ideal_op_functional': ['string'],
-                'ideal_op_leadership': ['string'],
-                'description': 'string'
+                'ideal_op_leadership': ['string']
             }
         details['sample_structure'] = sample_meta
     except Exception as e:
@@ -354,20 +930,38 @@ def clear_index(index_name: str, delete_index: bool = False) -> Dict[str, Any]:
     try:
         if delete_index:
             pc.delete_index(index_name)
+            _evict_index(index_name)
             return {'index_name': index_name, 'deleted_index': True}
         else:
-            index = pc.Index(index_name)
+            index = _get_index(index_name)
             index.delete(delete_all=True)
             return {'index_name': index_name, 'deleted_index': False, 'deleted_all_vectors': True}
     except Exception as e:
         return {'index_name': index_name, 'error': str(e)}
 
+def delete_legacy_vectors(index_name: str = 'company-information-dummy', batch_size: int = 1000) -> Dict[str, Any]:
+    """
+    Delete vectors stored under the old positional ids ("0", "1", ...).
+
+    Vectors are now keyed by description_id, so an index populated before the
+    switch would otherwise hold every company twice after the next ingest.
+    Run once after upgrading (or clear the index and re-ingest).
+    """
+    try:
+        index = _get_index(index_name)
+        legacy = [vector_id for page in index.list() for vector_id in page if vector_id.isdigit()]
+        for chunk in _chunks(legacy, batch_size):
+            index.delete(ids=list(chunk))
+        return {'index_name': index_name, 'deleted_count': len(legacy)}
+    except Exception as e:
+        return {'index_name': index_name, 'error': str(e)}
+
 def check_index_statistics():
     """
     Check index statistics to verify data ingestion
     """
     try:
-        index = pc.Index('company-information-dummy')
+        index = _get_index('company-information-dummy')
         stats = index.describe_index_stats()
         
         print(f"\nIndex Statistics:")
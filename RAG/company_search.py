@@ -1,32 +1,857 @@
 import os
-from openai import OpenAI
-from pinecone import Pinecone
+import re
+import sys
+import argparse
+import hashlib
+import functools
+import operator
+import queue
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+import orjson
+from cachetools import TTLCache
+from openai import OpenAI, BadRequestError, DefaultHttpxClient
+from pinecone.grpc import PineconeGRPC
 from dotenv import load_dotenv
+try:
+    from .revenue import parse_revenue
+except ImportError:
+    from revenue import parse_revenue
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Must match the settings the index was built with in company_embed.py
+EMBEDDING_MODEL = 'text-embedding-3-large'
+EMBEDDING_DIMENSIONS = int(os.getenv('EMBEDDING_DIMENSIONS', '3072'))
+
+# Initialize OpenAI client (HTTP/2, so concurrent embedding/reasoning calls share one connection).
+# Searches are interactive, so fail fast rather than using the SDK's 10 minute default timeout.
+OPENAI_TIMEOUT = 10.0
+OPENAI_MAX_RETRIES = 2
+client = OpenAI(
+    api_key=os.getenv('OPENAI_API_KEY'),
+    http_client=DefaultHttpxClient(http2=True),
+    timeout=OPENAI_TIMEOUT,
+    max_retries=OPENAI_MAX_RETRIES,
+)
 
 # Initialize Pinecone client
-pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+pc = PineconeGRPC(api_key=os.getenv('PINECONE_API_KEY'))
+
+# Optional faiss for the local vector index
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Optional Redis cache shared across workers (enabled when REDIS_URL is set)
+try:
+    import redis
+except ImportError:
+    redis = None
+_redis = redis.Redis.from_url(os.environ['REDIS_URL']) if redis and os.getenv('REDIS_URL') else None
+
+# Optional on-disk embedding cache that survives restarts (enabled when EMBEDDING_CACHE_DIR is set)
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+_disk_cache = diskcache.Cache(os.environ['EMBEDDING_CACHE_DIR']) if diskcache and os.getenv('EMBEDDING_CACHE_DIR') else None
+
+EMBEDDING_CACHE_TTL = 12 * 60 * 60
+RESULT_CACHE_TTL = 60 * 60
+LOCAL_RESULT_CACHE_TTL = 300
+
+# Per-process cache of exact repeat searches, checked before Redis and OpenAI. Results are
+# kept as orjson bytes and decoded on every hit, so callers can't mutate a cached entry.
+_result_cache = TTLCache(maxsize=1024, ttl=LOCAL_RESULT_CACHE_TTL)
+_result_cache_lock = threading.Lock()
+
+def _redis_get(key):
+    if _redis is None:
+        return None
+    try:
+        return _redis.get(key)
+    except Exception as e:
+        print(f"Redis cache read failed: {e}")
+        return None
+
+def _redis_setex(key, ttl, value):
+    if _redis is None:
+        return
+    try:
+        _redis.setex(key, ttl, value)
+    except Exception as e:
+        print(f"Redis cache write failed: {e}")
+
+def _disk_get(key):
+    if _disk_cache is None:
+        return None
+    try:
+        return _disk_cache.get(key)
+    except Exception as e:
+        print(f"Disk cache read failed: {e}")
+        return None
+
+def _disk_set(key, value):
+    if _disk_cache is None:
+        return
+    try:
+        _disk_cache.set(key, value)
+    except Exception as e:
+        print(f"Disk cache write failed: {e}")
+
+class SemanticQueryCache:
+    """
+    LRU cache of search results keyed by query embedding.
+
+    A lookup hits when a cached query with the same parameters (index, top_k,
+    filters) has cosine similarity >= threshold with the new query, so
+    near-duplicate phrasings reuse the earlier Pinecone results. Entries expire
+    after ttl seconds. Embeddings live in one contiguous float32 matrix so
+    similarity is a single mat-vec.
+    """
+
+    def __init__(self, capacity=1024, threshold=0.95, dimension=EMBEDDING_DIMENSIONS, ttl=LOCAL_RESULT_CACHE_TTL):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self._matrix = np.zeros((capacity, dimension), dtype=np.float32)
+        self._entries = OrderedDict()  # slot -> (params_key, result, expires_at), in LRU order
+        self._free = []  # slots of expired entries, reused before evicting
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding):
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def get(self, embedding, params_key):
+        with self._lock:
+            if not self._entries:
+                return None
+            slots = np.fromiter(self._entries.keys(), dtype=np.intp)
+            sims = self._matrix[slots] @ self._normalize(embedding)
+            now = time.monotonic()
+            for i in np.argsort(-sims):
+                if sims[i] < self.threshold:
+                    break
+                slot = int(slots[i])
+                cached_key, result, expires_at = self._entries[slot]
+                if expires_at <= now:
+                    del self._entries[slot]
+                    self._free.append(slot)
+                    continue
+                if cached_key == params_key:
+                    self._entries.move_to_end(slot)
+                    return result
+            return None
+
+    def put(self, embedding, params_key, result):
+        with self._lock:
+            if self._free:
+                slot = self._free.pop()
+            elif len(self._entries) < self.capacity:
+                slot = len(self._entries)
+            else:
+                slot, _ = self._entries.popitem(last=False)
+            self._matrix[slot] = self._normalize(embedding)
+            self._entries[slot] = (params_key, result, time.monotonic() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._free.clear()
+
+# Near-duplicate queries reuse earlier results instead of re-querying Pinecone
+_query_cache = SemanticQueryCache()
+
+def clear_search_caches():
+    """
+    Drop cached search results (per-process exact and semantic caches, and the
+    shared Redis results) so searches reflect an index that was just ingested
+    into or cleared. Query embeddings stay cached; they don't depend on the index.
+    Local snapshots from load_metadata_index/load_local_vector_index are not
+    touched and should be reloaded separately.
+    """
+    with _result_cache_lock:
+        _result_cache.clear()
+    _query_cache.clear()
+    if _redis is None:
+        return
+    try:
+        keys = list(_redis.scan_iter(match='topk:*', count=1000))
+        for start in range(0, len(keys), 1000):
+            _redis.delete(*keys[start:start + 1000])
+    except Exception as e:
+        print(f"Redis cache clear failed: {e}")
+
+# Local prefiltering is used when a filter narrows the search to at most this many vectors
+# per requested result (capped overall); every candidate's full vector is fetched, so
+# wider filters are cheaper as a filtered Pinecone query
+LOCAL_PREFILTER_CANDIDATES_PER_RESULT = 20
+LOCAL_PREFILTER_MAX_CANDIDATES = 200
+
+_RANGE_OPS = {'$gt': operator.gt, '$gte': operator.ge, '$lt': operator.lt, '$lte': operator.le}
+
+def _compile_condition(condition):
+    """
+    Turn a single-field Pinecone filter condition into a predicate on the
+    metadata value, or return None if it uses an operator we don't evaluate locally
+    """
+    if not isinstance(condition, dict):
+        condition = {'$eq': condition}
+    preds = []
+    for op, arg in condition.items():
+        if op in ('$eq', '$ne'):
+            negate = op == '$ne'
+            preds.append(lambda v, a=arg, n=negate: (a in v if isinstance(v, list) else v == a) != n)
+        elif op in ('$in', '$nin'):
+            allowed = set(arg)
+            negate = op == '$nin'
+            preds.append(lambda v, s=allowed, n=negate: (
+                any(x in s for x in v) if isinstance(v, list) else v in s
+            ) != n)
+        elif op in _RANGE_OPS:
+            if isinstance(arg, bool) or not isinstance(arg, (int, float)):
+                return None
+            fn = _RANGE_OPS[op]
+            preds.append(lambda v, a=arg, fn=fn: isinstance(v, (int, float)) and fn(v, a))
+        elif op == '$and' and isinstance(arg, list):
+            subs = [_compile_condition(c) for c in arg]
+            if any(sub is None for sub in subs):
+                return None
+            preds.append(lambda v, subs=subs: all(sub(v) for sub in subs))
+        else:
+            return None
+    return lambda v: all(pred(v) for pred in preds)
+
+def _equality_values(condition):
+    """Values a condition matches by equality ($eq / $in / bare value), else None"""
+    if not isinstance(condition, dict):
+        return [condition]
+    if len(condition) == 1:
+        op, arg = next(iter(condition.items()))
+        if op == '$eq':
+            return [arg]
+        if op == '$in':
+            return list(arg)
+    return None
+
+# Numeric fields encoded in filter signatures, with their bucket bounds. Field i
+# uses bits 16*i..16*i+7 for "value >= bound" and the next 8 for "value <= bound".
+_SIGNATURE_BOUNDS = {
+    'employees': (10, 50, 100, 250, 500, 1_000, 5_000, 10_000),
+    'revenue_numeric': (1e6, 5e6, 1e7, 5e7, 1e8, 5e8, 1e9, 1e10),
+}
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _value_signature(metadata):
+    """Signature bits for a vector's numeric metadata"""
+    sig = 0
+    for slot, (field, bounds) in enumerate(_SIGNATURE_BOUNDS.items()):
+        value = metadata.get(field)
+        if not _is_number(value):
+            continue
+        for k, bound in enumerate(bounds):
+            if value >= bound:
+                sig |= 1 << (16 * slot + k)
+            if value <= bound:
+                sig |= 1 << (16 * slot + 8 + k)
+    return sig
+
+def _condition_signature(slot, bounds, condition):
+    """Bits that every value satisfying a range condition is guaranteed to carry"""
+    if not isinstance(condition, dict):
+        condition = {'$eq': condition}
+    sig = 0
+    for op, arg in condition.items():
+        if op == '$and' and isinstance(arg, list):
+            for sub in arg:
+                sig |= _condition_signature(slot, bounds, sub)
+            continue
+        if not _is_number(arg):
+            continue
+        for k, bound in enumerate(bounds):
+            if op in ('$gte', '$gt', '$eq') and arg >= bound:
+                sig |= 1 << (16 * slot + k)
+            if op in ('$lte', '$lt', '$eq') and arg <= bound:
+                sig |= 1 << (16 * slot + 8 + k)
+    return sig
+
+class MetadataIndex:
+    """
+    In-memory snapshot of an index's metadata for client-side prefiltering.
+
+    Equality filters on the inverted fields are answered from
+    field -> value -> set(ids) postings, so a selective filter resolves to its
+    candidate ids in O(result) and only those vectors are fetched and scored,
+    instead of Pinecone scanning the index with a server-side filter.
+
+    Range filters on employees/revenue_numeric are prefiltered with a uint64
+    signature per vector (bucket bits, see _SIGNATURE_BOUNDS): one vectorized
+    AND + compare rejects most non-matching rows before any per-row check.
+    """
+
+    def __init__(self, fields=('industry', 'headquarters')):
+        self.metadata = {}
+        self.inverted = {field: defaultdict(set) for field in fields}
+        self._ids = []
+        self._rows = {}
+        self._signatures = []
+        self._signature_array = None
+        self._vocab_patterns = {}
+
+    def add(self, vector_id, metadata):
+        self.metadata[vector_id] = metadata
+        for field, postings in self.inverted.items():
+            value = metadata.get(field)
+            for v in (value if isinstance(value, list) else [value]):
+                if v is not None:
+                    postings[v].add(vector_id)
+
+        sig = _value_signature(metadata)
+        row = self._rows.get(vector_id)
+        if row is None:
+            self._rows[vector_id] = len(self._ids)
+            self._ids.append(vector_id)
+            self._signatures.append(sig)
+        else:
+            self._signatures[row] = sig
+        self._signature_array = None
+
+    def mentioned_values(self, field, text):
+        """
+        Values of an inverted field that appear as whole phrases in text
+        (case-insensitive), found with one scan of a compiled alternation
+        """
+        postings = self.inverted[field]
+        if not postings:
+            return []
+        cached = self._vocab_patterns.get(field)
+        if cached is None or cached[0] != len(postings):
+            by_lower = {}
+            for value in postings:
+                if isinstance(value, str) and value.strip():
+                    by_lower.setdefault(value.lower(), []).append(value)
+            # Longest first so "SaaS Data Analytics" wins over "SaaS"
+            alternation = '|'.join(re.escape(v) for v in sorted(by_lower, key=len, reverse=True))
+            pattern = re.compile(rf'(?<!\w)(?:{alternation})(?!\w)') if alternation else None
+            cached = (len(postings), pattern, by_lower)
+            self._vocab_patterns[field] = cached
+        _, pattern, by_lower = cached
+        if pattern is None:
+            return []
+        found = dict.fromkeys(m.group(0) for m in pattern.finditer(text.lower()))
+        return [value for lowered in found for value in by_lower[lowered]]
+
+    def _signature_matches(self, filter_dict):
+        """Ids whose signature carries every bit the filter requires, or None if it requires none"""
+        query_sig = 0
+        for slot, (field, bounds) in enumerate(_SIGNATURE_BOUNDS.items()):
+            if field in filter_dict:
+                query_sig |= _condition_signature(slot, bounds, filter_dict[field])
+        if not query_sig:
+            return None
+        if self._signature_array is None:
+            self._signature_array = np.array(self._signatures, dtype=np.uint64)
+        mask = np.uint64(query_sig)
+        hits = np.flatnonzero((self._signature_array & mask) == mask)
+        return {self._ids[i] for i in hits}
+
+    def candidates(self, filter_dict):
+        """
+        Return the set of ids matching filter_dict, or None when the filter has
+        neither an equality condition on an inverted field nor a signature-encoded
+        range, or can't be evaluated locally
+        """
+        postings_sets = []
+        remaining = []
+        for field, condition in filter_dict.items():
+            values = _equality_values(condition) if field in self.inverted else None
+            if values is not None:
+                postings = self.inverted[field]
+                postings_sets.append(set().union(*(postings.get(v, ()) for v in values)))
+                continue
+            pred = _compile_condition(condition)
+            if pred is None or field.startswith('$'):
+                return None
+            remaining.append((field, pred))
+        if postings_sets:
+            postings_sets.sort(key=len)
+            result = postings_sets[0].intersection(*postings_sets[1:])
+        else:
+            result = self._signature_matches(filter_dict)
+            if result is None:
+                return None
+        for field, pred in remaining:
+            result = {i for i in result if pred(self.metadata[i].get(field))}
+        return result
+
+# index_name -> MetadataIndex, populated by load_metadata_index
+_metadata_indexes = {}
+
+def _fetched_vectors(fetched):
+    return fetched.get('vectors', {}) if isinstance(fetched, dict) else getattr(fetched, 'vectors', {})
+
+def _vector_field(vector, name):
+    return vector.get(name) if isinstance(vector, dict) else getattr(vector, name, None)
+
+def load_metadata_index(index_name='company-information-dummy', batch_size=100):
+    """
+    Page through every vector's metadata into a MetadataIndex that
+    get_top_k_companies uses to prefilter locally.
+
+    This is a snapshot: call it at startup and again after ingesting. Indexes
+    that were never loaded keep using Pinecone's server-side filtering.
+    """
+    meta_index = MetadataIndex()
+    for vector_id, _, metadata in _iter_index_vectors(_index(index_name), batch_size):
+        meta_index.add(vector_id, metadata)
+    _metadata_indexes[index_name] = meta_index
+    return meta_index
+
+def _iter_index_vectors(index, batch_size=100):
+    """
+    Yield (id, values, metadata) for every vector in the index, paging ids with list()
+    """
+    for ids in index.list():
+        ids = list(ids)
+        for i in range(0, len(ids), batch_size):
+            fetched = index.fetch(ids=ids[i:i + batch_size])
+            for vector_id, vector in _fetched_vectors(fetched).items():
+                yield vector_id, _vector_field(vector, 'values'), _vector_field(vector, 'metadata') or {}
+
+# Unfiltered searches are answered locally when the best local match scores at least this
+LOCAL_INDEX_MIN_SCORE = 0.3
+
+# Below this many vectors an exhaustive float16 scan is both quicker to build and fast enough
+LOCAL_PQ_MIN_VECTORS = 10_000
+
+class LocalVectorIndex:
+    """
+    Compressed in-memory copy of an index's vectors for answering unfiltered
+    searches without a Pinecone round-trip.
+
+    Large indexes use faiss HNSW over product-quantized codes (pq_m bytes per
+    vector instead of 4 * dimension); small ones an exhaustive scan over
+    float16 codes.
+    Vectors are L2-normalized, so inner product is cosine similarity. Scores
+    from the PQ index are approximate.
+    """
+
+    def __init__(self, ids, metadata, vectors, pq_m=96, hnsw_m=32, ef_search=128):
+        if faiss is None:
+            raise ImportError("faiss is required for the local vector index (pip install faiss-cpu)")
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        faiss.normalize_L2(matrix)
+        dimension = matrix.shape[1]
+        if len(matrix) >= LOCAL_PQ_MIN_VECTORS and dimension % pq_m == 0:
+            self._faiss = faiss.IndexHNSWPQ(dimension, pq_m, hnsw_m, 8, faiss.METRIC_INNER_PRODUCT)
+            self._faiss.train(matrix)
+            self._faiss.hnsw.efSearch = ef_search
+        else:
+            # float16 codes halve memory traffic; faiss decodes them with SIMD and accumulates in float32
+            self._faiss = faiss.IndexScalarQuantizer(
+                dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            )
+        self._faiss.add(matrix)
+        self.ids = ids
+        self.metadata = metadata
+
+    def search(self, query_embedding, top_k):
+        """Return matches in the same shape as index.query"""
+        query = np.ascontiguousarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(query)
+        scores, rows = self._faiss.search(query, top_k)
+        return {
+            'matches': [
+                {'id': self.ids[row], 'score': float(score), 'metadata': self.metadata[row]}
+                for score, row in zip(scores[0], rows[0]) if row >= 0
+            ]
+        }
+
+# index_name -> LocalVectorIndex, populated by load_local_vector_index
+_local_vector_indexes = {}
+
+def load_local_vector_index(index_name='company-information-dummy', batch_size=100, **kwargs):
+    """
+    Download every vector and its metadata into a LocalVectorIndex that
+    get_top_k_companies uses for unfiltered searches. Requires faiss.
+
+    Like load_metadata_index this is a snapshot: reload after ingesting.
+    """
+    ids, metadata, vectors = [], [], []
+    for vector_id, values, meta in _iter_index_vectors(_index(index_name), batch_size):
+        ids.append(vector_id)
+        metadata.append(meta)
+        vectors.append(values)
+    if not ids:
+        _local_vector_indexes.pop(index_name, None)
+        return None
+    local_index = LocalVectorIndex(ids, metadata, vectors, **kwargs)
+    _local_vector_indexes[index_name] = local_index
+    return local_index
+
+def rerank_by_cosine(query_embedding, vectors, top_k):
+    """
+    Rank candidate vectors against a query by cosine similarity.
+
+    Candidates are packed into one contiguous float32 matrix and L2-normalized
+    in place, so scoring is a single BLAS mat-vec; only the top_k scores are
+    fully sorted. Returns (row indices best-first, scores aligned with them).
+    """
+    matrix = np.array(vectors, dtype=np.float32, order='C', ndmin=2)
+    if matrix.size == 0 or top_k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query_norm = np.linalg.norm(query)
+    if query_norm:
+        query = query / query_norm
+
+    scores = matrix @ query
+    if top_k < len(scores):
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        top = np.arange(len(scores))
+    order = top[np.argsort(-scores[top], kind='stable')]
+    return order, scores[order]
+
+def _query_candidates(index, query_embedding, candidate_ids, top_k, batch_size=100):
+    """
+    Fetch the candidate vectors and rank them by cosine similarity locally.
+    Returns matches in the same shape as index.query.
+    """
+    candidate_ids = list(candidate_ids)
+    chunks = [candidate_ids[i:i + batch_size] for i in range(0, len(candidate_ids), batch_size)]
+    if not chunks:
+        return {'matches': []}
+    with ThreadPoolExecutor(max_workers=min(len(chunks), 8)) as executor:
+        responses = list(executor.map(lambda ids: index.fetch(ids=ids), chunks))
+
+    ids, values, metadata = [], [], []
+    for fetched in responses:
+        for vector_id, vector in _fetched_vectors(fetched).items():
+            ids.append(vector_id)
+            values.append(_vector_field(vector, 'values'))
+            metadata.append(_vector_field(vector, 'metadata') or {})
+    if not ids:
+        return {'matches': []}
+
+    order, scores = rerank_by_cosine(query_embedding, values, top_k)
+    return {
+        'matches': [
+            {'id': ids[j], 'score': float(score), 'metadata': metadata[j]}
+            for j, score in zip(order, scores)
+        ]
+    }
+
+def _numeric_revenue_condition(condition):
+    """
+    Rewrite a revenue condition's operands ("$100M", "1.2B", 5e6) as numbers,
+    so it can be applied to the numeric revenue_numeric metadata field.
+    Returns None if any operand isn't a revenue.
+    """
+    if isinstance(condition, dict):
+        converted = {op: _numeric_revenue_condition(arg) for op, arg in condition.items()}
+    elif isinstance(condition, (list, tuple)):
+        converted = [_numeric_revenue_condition(arg) for arg in condition]
+    else:
+        return parse_revenue(condition)
+    values = converted.values() if isinstance(converted, dict) else converted
+    return None if any(v is None for v in values) else converted
+
+def _build_filter(industry_filter=None, location_filter=None, revenue_filter=None, employees_filter=None):
+    """
+    Assemble the Pinecone metadata filter shared by get_top_k_companies and search_companies
+
+    Revenue conditions accept strings like "$100M" and are applied to the
+    numeric revenue_numeric field (Pinecone range operators need numbers);
+    a revenue condition with an unparseable bound is ignored.
+
+    Returns:
+        tuple: (filter dict for index.query, or None if no filters;
+                filters_applied dict keyed by the API-facing filter names)
+    """
+    filter_dict = {}
+    filters_applied = {}
+    for field, name, value in (
+        ('industry', 'industry', industry_filter),
+        ('headquarters', 'location', location_filter),
+        ('revenue_numeric', 'revenue', revenue_filter),
+        ('employees', 'employees', employees_filter),
+    ):
+        if not value:
+            continue
+        condition = _numeric_revenue_condition(value) if field == 'revenue_numeric' else value
+        if condition is None:
+            continue
+        filter_dict[field] = condition
+        filters_applied[name] = value
+    return filter_dict or None, filters_applied
+
+@functools.lru_cache(maxsize=8)
+def _index(name):
+    """Return a cached Pinecone Index handle so its connection pool is reused across queries"""
+    return pc.Index(name)
+
+def _freeze(value):
+    """
+    Convert nested filter dicts/lists into a hashable, order-independent key
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _quantize_embedding(embedding):
+    """
+    Pack an embedding as a float32 scale followed by int8 codes (4x smaller than float32)
+    """
+    vec = np.asarray(embedding, dtype=np.float32)
+    scale = np.float32(np.max(np.abs(vec)) / 127) if vec.size else np.float32(0)
+    codes = np.round(vec / scale) if scale else np.zeros_like(vec)
+    return scale.tobytes() + codes.astype(np.int8).tobytes()
+
+def _dequantize_embedding(blob):
+    scale = np.frombuffer(blob[:4], dtype=np.float32)[0]
+    return np.frombuffer(blob[4:], dtype=np.int8).astype(np.float32) * scale
+
+class EmbeddingBatcher:
+    """
+    Coalesce concurrent query embeddings into one OpenAI request.
+
+    Callers block on a Future while a background thread collects whatever
+    arrives within max_wait seconds of the first request (up to max_batch
+    texts) and embeds it with a single embeddings.create(input=[...]) call,
+    so N simultaneous searches cost one round-trip instead of N. Batches are
+    sent from a small thread pool, so one slow request doesn't hold up the
+    batches collected behind it; callers give up after timeout seconds.
+    """
+
+    def __init__(self, model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS, max_batch=100, max_wait=0.01,
+                 max_in_flight=4, timeout=OPENAI_TIMEOUT * (OPENAI_MAX_RETRIES + 1) + 5, embeddings=None):
+        self.model = model
+        self.dimensions = dimensions
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self._embeddings = embeddings  # defaults to client.embeddings
+        self._queue = queue.Queue()
+        self._worker = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def embed(self, text):
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((text, future))
+        return future.result(timeout=self.timeout)
+
+    def _ensure_worker(self):
+        # Started lazily (and restarted if gone) so forked server workers get their own threads
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='embedding-batch')
+                self._worker = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._embed_batch, batch)
+
+    def _embed_batch(self, batch):
+        embeddings = self._embeddings or client.embeddings
+        try:
+            response = embeddings.create(
+                input=[text for text, _ in batch], model=self.model, dimensions=self.dimensions
+            )
+        except BadRequestError as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Retry one by one so a single bad input doesn't fail every caller in the batch
+            for item in batch:
+                self._embed_batch([item])
+            return
+        except Exception as e:
+            # Rate limits and connection errors would fail each item the same way
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), data in zip(batch, sorted(response.data, key=lambda d: d.index)):
+            future.set_result(data.embedding)
+
+_embedding_batcher = EmbeddingBatcher()
+
+def _frozen_embedding(embedding):
+    # float32 arrays take 12KB per 3072-dim entry, vs ~98KB as a tuple of Python floats
+    vec = np.array(embedding, dtype=np.float32)
+    vec.flags.writeable = False
+    return vec
+
+@functools.lru_cache(maxsize=4096)
+def _embed_cached(text_normalized):
+    key = f"emb8:{hashlib.sha1(f'{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONS}:{text_normalized}'.encode('utf-8')).hexdigest()}"
+    cached = _disk_get(key)
+    if cached is not None:
+        return _frozen_embedding(_dequantize_embedding(cached))
+    cached = _redis_get(key)
+    if cached is not None:
+        _disk_set(key, cached)
+        return _frozen_embedding(_dequantize_embedding(cached))
+
+    embedding = _embedding_batcher.embed(text_normalized)
+    quantized = _quantize_embedding(embedding)
+    _redis_setex(key, EMBEDDING_CACHE_TTL, quantized)
+    _disk_set(key, quantized)
+    return _frozen_embedding(embedding)
 
 def generate_embedding(text):
     """
     Generate embedding using OpenAI's text-embedding-3-large model
+
+    Queries are normalized (trimmed, lower-cased, whitespace collapsed) and
+    memoized in-process, so repeated queries skip the OpenAI round-trip.
+    Returns the cached read-only float32 array (not a copy), or None on error.
     """
     try:
-        response = client.embeddings.create(
-            input=text,
-            model='text-embedding-3-large'
-        )
-        return response.data[0].embedding
+        return _embed_cached(' '.join(text.split()).lower())
     except Exception as e:
         print(f"Error generating embedding: {e}")
         return None
 
-def get_top_k_companies(query, top_k=5, industry_filter=None, location_filter=None, revenue_filter=None, employees_filter=None, with_reasoning=False, index_name='company-information-dummy'):
+def embedding_cache_info():
+    """
+    Return hit/miss counters for the query embedding cache
+    """
+    info = _embed_cached.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize}
+
+# Pulls every displayed metadata field in one C-level call per match
+_get_company_metadata = operator.itemgetter(
+    'company_name', 'industry', 'headquarters', 'revenue', 'employees', 'business_model',
+    'strategic_priorities', 'ideal_op_industry', 'ideal_op_functional', 'ideal_op_leadership'
+)
+
+def _search_core(query_embedding, top_k, filter_dict, index_name):
+    """
+    Run one vector search, shared by get_top_k_companies and search_companies.
+
+    Tries the local paths first (metadata prefilter for selective filters,
+    local vector index for unfiltered searches) and falls back to a Pinecone
+    query. Returns a response with 'matches' in index.query's shape.
+    """
+    index = _index(index_name)
+    
+    # Selective filters are resolved against the local metadata snapshot, if loaded
+    meta_index = _metadata_indexes.get(index_name)
+    if meta_index is not None and filter_dict:
+        candidates = meta_index.candidates(filter_dict)
+        max_candidates = min(LOCAL_PREFILTER_MAX_CANDIDATES, LOCAL_PREFILTER_CANDIDATES_PER_RESULT * top_k)
+        if candidates is not None and len(candidates) <= max_candidates:
+            return _query_candidates(index, query_embedding, candidates, top_k)
+    
+    # Unfiltered searches go to the local vector index first, if loaded and confident
+    local_index = _local_vector_indexes.get(index_name)
+    if local_index is not None and not filter_dict:
+        local_results = local_index.search(query_embedding, top_k)
+        if local_results['matches'] and local_results['matches'][0]['score'] >= LOCAL_INDEX_MIN_SCORE:
+            return local_results
+    
+    query_params = {
+        'vector': np.asarray(query_embedding, dtype=np.float32).tolist(),
+        'top_k': top_k,
+        'include_values': False,  # matches only need scores and metadata
+        'include_metadata': True
+    }
+    if filter_dict:
+        query_params['filter'] = filter_dict
+    return index.query(**query_params)
+
+def infer_query_filters(query, index_name='company-information-dummy'):
+    """
+    Derive industry/location filters from values named in the query text.
+
+    Uses the vocabulary of the loaded metadata snapshot (see
+    load_metadata_index); returns (industry_filter, location_filter), each
+    None when nothing known is mentioned or no snapshot is loaded.
+    """
+    meta_index = _metadata_indexes.get(index_name)
+    if meta_index is None:
+        return None, None
+    industries = meta_index.mentioned_values('industry', query)
+    locations = meta_index.mentioned_values('headquarters', query)
+    return (
+        {"$in": industries} if industries else None,
+        {"$in": locations} if locations else None,
+    )
+
+def _company_from_match(rank, match):
+    """
+    Build the API-facing company dict for one Pinecone match
+    """
+    (company_name, industry, headquarters, revenue, employees, business_model,
+     strategic_priorities, ideal_op_industry, ideal_op_functional,
+     ideal_op_leadership) = _get_company_metadata(match['metadata'])
+    return {
+        "rank": rank,
+        "score": round(match['score'], 3),
+        "company_name": company_name,
+        "industry": industry,
+        "headquarters": headquarters,
+        "revenue": revenue,
+        "employees": employees,
+        "business_model": business_model,
+        "strategic_priorities": strategic_priorities,
+        "ideal_op_industry": ideal_op_industry,
+        "ideal_op_functional": ideal_op_functional,
+        "ideal_op_leadership": ideal_op_leadership,
+    }
+
+def iter_top_k_companies(query, top_k=5, industry_filter=None, location_filter=None, revenue_filter=None, employees_filter=None, index_name='company-information-dummy'):
+    """
+    Yield company dicts for a query lazily, best match first.
+
+    A lightweight alternative to get_top_k_companies for callers that only
+    need the first few matches or a count: no reasoning, summary or result
+    caching, and each dict is only built when it is consumed. Raises if the
+    query embedding can't be generated.
+    """
+    query_embedding = generate_embedding(query)
+    if query_embedding is None:
+        raise RuntimeError("Failed to generate query embedding")
+    
+    filter_dict, _ = _build_filter(industry_filter, location_filter, revenue_filter, employees_filter)
+    results = _search_core(query_embedding, top_k, filter_dict, index_name)
+    for i, match in enumerate((results and results.get('matches')) or [], 1):
+        yield _company_from_match(i, match)
+
+def get_top_k_companies(query, top_k=5, industry_filter=None, location_filter=None, revenue_filter=None, employees_filter=None, with_reasoning=False, index_name='company-information-dummy', infer_filters=False):
     """
     Get top k companies for a query and return structured results
     
@@ -39,15 +864,39 @@ def get_top_k_companies(query, top_k=5, industry_filter=None, location_filter=No
         employees_filter (dict): Optional employees filter, e.g., {"$gte": 100} for 100+ employees
         with_reasoning (bool): Whether to include reasoning for each company selection
         index_name (str): Name of the Pinecone index to search
+        infer_filters (bool): Add industry/location filters for known values named in the
+            query (only where no explicit filter is given; needs load_metadata_index)
     
     Returns:
         dict: Structured results containing query, companies, and optionally reasoning
     """
     try:
+        # Push intent named in the query into the metadata filter so Pinecone prunes server-side
+        if infer_filters and (industry_filter is None or location_filter is None):
+            inferred_industry, inferred_location = infer_query_filters(query, index_name)
+            industry_filter = industry_filter if industry_filter is not None else inferred_industry
+            location_filter = location_filter if location_filter is not None else inferred_location
+        
+        # Exact repeats are served from the local, then the shared, result cache
+        result_key = "topk:" + hashlib.sha1(orjson.dumps(
+            [index_name, query, top_k, with_reasoning, industry_filter, location_filter, revenue_filter, employees_filter],
+            option=orjson.OPT_SORT_KEYS
+        )).hexdigest()
+        with _result_cache_lock:
+            cached_result = _result_cache.get(result_key)
+        if cached_result is not None:
+            return orjson.loads(cached_result)
+        
+        cached_result = _redis_get(result_key)
+        if cached_result is not None:
+            with _result_cache_lock:
+                _result_cache[result_key] = cached_result
+            return orjson.loads(cached_result)
+        
         # Generate embedding for the query
         query_embedding = generate_embedding(query)
         
-        if not query_embedding:
+        if query_embedding is None:
             return {
                 "query": query,
                 "top_k": top_k,
@@ -58,59 +907,44 @@ def get_top_k_companies(query, top_k=5, industry_filter=None, location_filter=No
                 "search_summary": "Unable to process query"
             }
         
-        # Search in Pinecone
-        index = pc.Index(index_name)
-        
-        # Prepare query parameters
-        query_params = {
-            'vector': query_embedding,
-            'top_k': top_k,
-            'include_metadata': True
-        }
+        # Serve near-duplicate queries with identical parameters from the cache. Reasoning
+        # explains a match for one specific query text, so those results aren't shared.
+        cache_key = (
+            index_name, top_k,
+            _freeze([industry_filter, location_filter, revenue_filter, employees_filter])
+        )
+        cached = None if with_reasoning else _query_cache.get(query_embedding, cache_key)
+        if cached is not None:
+            cached = orjson.loads(cached)
+            return {
+                **cached,
+                "query": query,
+                "search_summary": generate_search_summary(query, cached['companies'], cached['filters_applied'])
+            }
         
         # Build metadata filter if any filters are provided
-        filters_applied = {}
-        if any([industry_filter, location_filter, revenue_filter, employees_filter]):
-            filter_dict = {}
-            if industry_filter:
-                filter_dict['industry'] = industry_filter
-                filters_applied['industry'] = industry_filter
-            if location_filter:
-                filter_dict['headquarters'] = location_filter
-                filters_applied['location'] = location_filter
-            if revenue_filter:
-                filter_dict['revenue'] = revenue_filter
-                filters_applied['revenue'] = revenue_filter
-            if employees_filter:
-                filter_dict['employees'] = employees_filter
-                filters_applied['employees'] = employees_filter
-            
-            query_params['filter'] = filter_dict
-        
-        results = index.query(**query_params)
+        filter_dict, filters_applied = _build_filter(industry_filter, location_filter, revenue_filter, employees_filter)
+        results = _search_core(query_embedding, top_k, filter_dict, index_name)
         
         # Structure the results with reasoning
         companies = []
         if results and results.get('matches'):
-            for i, match in enumerate(results['matches'], 1):
-                company_data = {
-                    "rank": i,
-                    "score": round(match['score'], 3),
-                    "company_name": match['metadata']['company_name'],
-                    "industry": match['metadata']['industry'],
-                    "headquarters": match['metadata']['headquarters'],
-                    "revenue": match['metadata']['revenue'],
-                    "employees": match['metadata']['employees'],
-                    "business_model": match['metadata']['business_model'],
-                    "strategic_priorities": match['metadata']['strategic_priorities'],
-                    "ideal_op_industry": match['metadata']['ideal_op_industry'],
-                    "ideal_op_functional": match['metadata']['ideal_op_functional'],
-                    "ideal_op_leadership": match['metadata']['ideal_op_leadership'],
-                }
+            matches = results['matches']
+            
+            # Reasoning calls are independent GPT-4o requests, so run them concurrently
+            reasonings = [None] * len(matches)
+            if with_reasoning:
+                with ThreadPoolExecutor(max_workers=min(len(matches), 8)) as executor:
+                    reasonings = list(executor.map(
+                        lambda m: generate_company_reasoning(query, m['metadata'], m['score']),
+                        matches
+                    ))
+            
+            for i, (match, reasoning) in enumerate(zip(matches, reasonings), 1):
+                company_data = _company_from_match(i, match)
                 
                 # Add reasoning if requested
                 if with_reasoning:
-                    reasoning = generate_company_reasoning(query, match['metadata'], match['score'])
                     company_data["reasoning"] = reasoning
                 
                 companies.append(company_data)
@@ -118,7 +952,7 @@ def get_top_k_companies(query, top_k=5, industry_filter=None, location_filter=No
         # Generate search summary
         search_summary = generate_search_summary(query, companies, filters_applied)
         
-        return {
+        result = {
             "query": query,
             "top_k": top_k,
             "filters_applied": filters_applied,
@@ -126,6 +960,15 @@ def get_top_k_companies(query, top_k=5, industry_filter=None, location_filter=No
             "total_found": len(companies),
             "search_summary": search_summary
         }
+        # A failed reasoning call shouldn't be replayed to later callers, so retry it next time
+        if not any(_REASONING_FALLBACK in (company.get("reasoning") or "") for company in companies):
+            serialized = orjson.dumps(result)
+            if not with_reasoning:
+                _query_cache.put(query_embedding, cache_key, serialized)
+            with _result_cache_lock:
+                _result_cache[result_key] = serialized
+            _redis_setex(result_key, RESULT_CACHE_TTL, serialized)
+        return result
         
     except Exception as e:
         return {
@@ -180,6 +1023,13 @@ def parse_filter_params(industry_list=None, location_list=None, revenue_min=None
     Returns:
         tuple: (industry_filter, location_filter, revenue_filter, employees_filter)
     """
+    # Parsed filters are cached per raw parameter set; decoding gives each caller fresh dicts
+    return tuple(orjson.loads(_parse_filter_params_cached(
+        industry_list, location_list, revenue_min, revenue_max, employees_min, employees_max
+    )))
+
+@functools.lru_cache(maxsize=512)
+def _parse_filter_params_cached(industry_list, location_list, revenue_min, revenue_max, employees_min, employees_max):
     industry_filter = None
     location_filter = None
     revenue_filter = None
@@ -187,47 +1037,58 @@ def parse_filter_params(industry_list=None, location_list=None, revenue_min=None
     
     # Parse industry filter
     if industry_list:
-        industries = [i.strip() for i in industry_list.split(',') if i.strip()]
+        industries = [i for i in map(str.strip, industry_list.split(',')) if i]
         if industries:
             industry_filter = {"$in": industries}
     
     # Parse location filter
     if location_list:
-        locations = [l.strip() for l in location_list.split(',') if l.strip()]
+        locations = [l for l in map(str.strip, location_list.split(',')) if l]
         if locations:
             location_filter = {"$in": locations}
     
-    # Parse revenue filter
+    # Parse revenue filter (bounds stay as given, e.g. "$100M"; _build_filter makes them numeric)
     if revenue_min or revenue_max:
-        revenue_conditions = []
+        revenue_filter = {}
         if revenue_min:
-            revenue_conditions.append({"$gte": revenue_min})
+            revenue_filter["$gte"] = revenue_min
         if revenue_max:
-            revenue_conditions.append({"$lte": revenue_max})
-        
-        if len(revenue_conditions) == 1:
-            revenue_filter = revenue_conditions[0]
-        elif len(revenue_conditions) == 2:
-            revenue_filter = {"$and": revenue_conditions}
+            revenue_filter["$lte"] = revenue_max
+        if any(parse_revenue(bound) is None for bound in revenue_filter.values()):
+            # Invalid revenue format, ignore revenue filter
+            revenue_filter = None
     
     # Parse employees filter
     if employees_min or employees_max:
         try:
-            employees_conditions = []
+            employees_filter = {}
             if employees_min:
-                employees_conditions.append({"$gte": int(employees_min)})
+                employees_filter["$gte"] = int(employees_min)
             if employees_max:
-                employees_conditions.append({"$lte": int(employees_max)})
-            
-            if len(employees_conditions) == 1:
-                employees_filter = employees_conditions[0]
-            elif len(employees_conditions) == 2:
-                employees_filter = {"$and": employees_conditions}
+                employees_filter["$lte"] = int(employees_max)
         except ValueError:
             # Invalid number format, ignore employees filter
-            pass
+            employees_filter = None
     
-    return industry_filter, location_filter, revenue_filter, employees_filter
+    return orjson.dumps([industry_filter, location_filter, revenue_filter, employees_filter])
+
+# Identical for every match and query, so it is built once at import
+REASONING_SYSTEM_PROMPT = """You are an expert business analyst. Your task is to explain why a specific company was selected as a match for a search query.
+
+IMPORTANT: Only use the provided company information and query. If something is not explicitly mentioned in the provided documents, say "Not found" rather than making assumptions.
+
+Analyze the company's characteristics against the search query and provide a concise, factual explanation (400-600 tokens) of why this company is a good match. Focus on:
+1. Industry alignment
+2. Location relevance (if applicable)
+3. Business model fit
+4. Strategic priorities alignment
+5. Size/revenue characteristics
+6. Semantic similarity score interpretation
+
+Be specific and reference actual data from the company information provided."""
+
+# Marks the similarity-only reasoning returned when the GPT-4o call fails
+_REASONING_FALLBACK = "Error generating detailed reasoning"
 
 def generate_company_reasoning(query, company_metadata, score):
     """
@@ -250,20 +1111,6 @@ Company Information:
 - Semantic Similarity Score: {score:.3f}
 """
 
-        system_prompt = """You are an expert business analyst. Your task is to explain why a specific company was selected as a match for a search query.
-
-IMPORTANT: Only use the provided company information and query. If something is not explicitly mentioned in the provided documents, say "Not found" rather than making assumptions.
-
-Analyze the company's characteristics against the search query and provide a concise, factual explanation (400-600 tokens) of why this company is a good match. Focus on:
-1. Industry alignment
-2. Location relevance (if applicable)
-3. Business model fit
-4. Strategic priorities alignment
-5. Size/revenue characteristics
-6. Semantic similarity score interpretation
-
-Be specific and reference actual data from the company information provided."""
-
         user_prompt = f"""Search Query: "{query}"
 
 {company_info}
@@ -274,7 +1121,7 @@ Explain why this company was selected as a match for the search query. Use only
         response = client.chat.completions.create(
             model="gpt-4o",
             messages=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": REASONING_SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
             ],
             max_tokens=600,
@@ -289,7 +1136,7 @@ Explain why this company was selected as a match for the search query. Use only
         
     except Exception as e:
         # Fallback to basic reasoning if GPT-4o fails
-        return f"Selected based on semantic similarity (score: {score:.3f}). Error generating detailed reasoning: {str(e)}"
+        return f"Selected based on semantic similarity (score: {score:.3f}). {_REASONING_FALLBACK}: {str(e)}"
 
 def generate_search_summary(query, companies, filters_applied):
     """
@@ -299,9 +1146,22 @@ def generate_search_summary(query, companies, filters_applied):
         return f"No companies found matching '{query}'"
     
     total_found = len(companies)
-    industries = list(set(c['industry'] for c in companies))
-    locations = list(set(c['headquarters'] for c in companies))
-    revenue_range = f"{min(c['revenue'] for c in companies)} - {max(c['revenue'] for c in companies)}"
+    
+    # Collect industries, locations (unique, in rank order) and the revenue bounds in one pass
+    industries = {}
+    locations = {}
+    revenue_min = revenue_max = companies[0]['revenue']
+    for c in companies:
+        industries[c['industry']] = None
+        locations[c['headquarters']] = None
+        revenue = c['revenue']
+        if revenue < revenue_min:
+            revenue_min = revenue
+        elif revenue > revenue_max:
+            revenue_max = revenue
+    industries = list(industries)
+    locations = list(locations)
+    revenue_range = f"{revenue_min} - {revenue_max}"
     
     summary_parts = [f"Found {total_found} companies matching '{query}'"]
     
@@ -329,17 +1189,9 @@ def generate_search_summary(query, companies, filters_applied):
 
 
 
-def search_companies(query, top_k=5, industry_filter=None, location_filter=None, revenue_filter=None, employees_filter=None):
+def _print_search_header(query, industry_filter=None, location_filter=None, revenue_filter=None, employees_filter=None):
     """
-    Search for companies using semantic search with optional metadata filtering
-    
-    Args:
-        query (str): Search query text
-        top_k (int): Number of results to return
-        industry_filter (dict): Optional industry filter
-        location_filter (dict): Optional location filter
-        revenue_filter (dict): Optional revenue filter
-        employees_filter (dict): Optional employees filter
+    Print the query and its active filters
     """
     print(f"\nSearching for: '{query}'")
     
@@ -356,40 +1208,34 @@ def search_companies(query, top_k=5, industry_filter=None, location_filter=None,
     
     if filters:
         print(f"Active filters: {', '.join(filters)}")
+
+def search_companies(query, top_k=5, industry_filter=None, location_filter=None, revenue_filter=None, employees_filter=None, verbose=True):
+    """
+    Search for companies using semantic search with optional metadata filtering
+    
+    Args:
+        query (str): Search query text
+        top_k (int): Number of results to return
+        industry_filter (dict): Optional industry filter
+        location_filter (dict): Optional location filter
+        revenue_filter (dict): Optional revenue filter
+        employees_filter (dict): Optional employees filter
+        verbose (bool): Print the query and active filters before searching
+    """
+    if verbose:
+        _print_search_header(query, industry_filter, location_filter, revenue_filter, employees_filter)
     
     try:
         # Generate embedding for the query
         query_embedding = generate_embedding(query)
         
-        if not query_embedding:
+        if query_embedding is None:
             print("❌ Failed to generate query embedding")
             return None
         
-        # Search in Pinecone
-        index = pc.Index('company-information-dummy')
-        
-        # Prepare query parameters
-        query_params = {
-            'vector': query_embedding,
-            'top_k': top_k,
-            'include_metadata': True
-        }
-        
-        # Build metadata filter if any filters are provided
-        if any([industry_filter, location_filter, revenue_filter, employees_filter]):
-            filter_dict = {}
-            if industry_filter:
-                filter_dict['industry'] = industry_filter
-            if location_filter:
-                filter_dict['headquarters'] = location_filter
-            if revenue_filter:
-                filter_dict['revenue'] = revenue_filter
-            if employees_filter:
-                filter_dict['employees'] = employees_filter
-            
-            query_params['filter'] = filter_dict
-        
-        results = index.query(**query_params)
+        # Search in Pinecone (or a loaded local snapshot)
+        filter_dict, _ = _build_filter(industry_filter, location_filter, revenue_filter, employees_filter)
+        results = _search_core(query_embedding, top_k, filter_dict, 'company-information-dummy')
         
         return results
     except Exception as e:
@@ -404,25 +1250,27 @@ def display_search_results(results):
         print("No results found")
         return
     
-    print(f"\nFound {len(results['matches'])} similar companies:")
-    print("-" * 80)
-    
+    # Build the whole listing and write it once instead of one print per field
+    lines = [f"\nFound {len(results['matches'])} similar companies:", "-" * 80]
     for i, match in enumerate(results['matches'], 1):
-        print(f"{i}. Score: {match['score']:.3f}")
-        print(f"   Company: {match['metadata']['company_name']}")
-        print(f"   Industry: {match['metadata']['industry']}")
-        print(f"   Location: {match['metadata']['headquarters']}")
-        print(f"   Revenue: {match['metadata']['revenue']}")
-        print(f"   Employees: {match['metadata']['employees']}")
-        print(f"   Business Model: {match['metadata']['business_model'][:100]}...")
-        print()
+        m = match['metadata']
+        lines.append(
+            f"{i}. Score: {match['score']:.3f}\n"
+            f"   Company: {m['company_name']}\n"
+            f"   Industry: {m['industry']}\n"
+            f"   Location: {m['headquarters']}\n"
+            f"   Revenue: {m['revenue']}\n"
+            f"   Employees: {m['employees']}\n"
+            f"   Business Model: {m['business_model'][:100]}...\n"
+        )
+    print("\n".join(lines))
 
 def check_index_statistics():
     """
     Check index statistics to verify data ingestion
     """
     try:
-        index = pc.Index('company-information-dummy')
+        index = _index('company-information-dummy')
         stats = index.describe_index_stats()
         
         print(f"\nIndex Statistics:")
@@ -539,7 +1387,39 @@ def interactive_search():
             print("Invalid choice. Please try again.")
 
 
-if __name__ == "__main__":
+def _write_jsonl(records):
+    """
+    Write records to stdout as JSON lines in a single write
+    """
+    data = b''.join(orjson.dumps(record) + b'\n' for record in records)
+    sys.stdout.flush()  # keep ordering with any earlier print() output
+    buffer = getattr(sys.stdout, 'buffer', None)
+    if buffer is None:
+        # Text-only streams (e.g. StringIO, some IDE consoles) have no binary buffer
+        sys.stdout.write(data.decode())
+        sys.stdout.flush()
+        return
+    buffer.write(data)
+    buffer.flush()
+
+def demonstrate_get_top_k_companies():
+    """
+    Run a few example get_top_k_companies searches concurrently and print each
+    result as one JSON line
+    """
+    examples = [
+        {'query': 'edtech companies with digital transformation focus', 'top_k': 3},
+        {'query': 'data analytics companies', 'top_k': 3, 'industry_filter': {'$in': ['SaaS Data Analytics']}},
+        {'query': 'technology companies', 'top_k': 3, 'employees_filter': {'$gte': 200}},
+        {'query': 'logistics companies needing operational excellence', 'top_k': 2, 'with_reasoning': True},
+    ]
+    with ThreadPoolExecutor(max_workers=len(examples)) as executor:
+        _write_jsonl(executor.map(lambda example: get_top_k_companies(**example), examples))
+
+def legacy_repl():
+    """
+    Original script behaviour: demo searches, then the interactive menu
+    """
     # Check if index exists and has data
     stats = check_index_statistics()
     
@@ -561,37 +1441,107 @@ if __name__ == "__main__":
         print("EXAMPLE SEARCHES")
         print("="*80)
         
-        # Search 1: EdTech companies
-        print("\n1. Searching for EdTech companies...")
-        results1 = search_companies("edtech companies with digital transformation focus")
-        display_search_results(results1)
-        
-        # Search 2: Location-based search
-        print("\n2. Searching by location...")
-        results2 = search_companies("companies in California")
-        display_search_results(results2)
-        
-        # Search 3: Industry-based search WITH filter
-        print("\n3. Searching for SaaS companies...")
-        results3 = search_companies(
-            "data analytics companies",
-            industry_filter={"$in": ["SaaS Data Analytics"]}
-        )
-        display_search_results(results3)
-        
-        # Search 4: Revenue-based search with filter
-        print("\n4. Searching for high-revenue companies...")
-        results4 = search_companies(
-            "successful companies",
-            revenue_filter={"$gte": "$100M"}
-        )
-        display_search_results(results4)
-        
-        # Search 5: Multiple filters
-        print("\n5. Searching for large technology companies in California...")
-        results5 = search_companies(
-            "technology companies",
-            location_filter={"$in": ["California", "CA"]},
-            employees_filter={"$gte": 200}
-        )
-        display_search_results(results5)
+        examples = [
+            ("1. Searching for EdTech companies...",
+             {'query': "edtech companies with digital transformation focus"}),
+            ("2. Searching by location...",
+             {'query': "companies in California"}),
+            ("3. Searching for SaaS companies...",
+             {'query': "data analytics companies", 'industry_filter': {"$in": ["SaaS Data Analytics"]}}),
+            ("4. Searching for high-revenue companies...",
+             {'query': "successful companies", 'revenue_filter': {"$gte": "$100M"}}),
+            ("5. Searching for large technology companies in California...",
+             {'query': "technology companies", 'location_filter': {"$in": ["California", "CA"]},
+              'employees_filter': {"$gte": 200}}),
+        ]
+        # Run the searches concurrently (the embedding batcher folds their embeddings into
+        # one OpenAI request), then print in order; map preserves the input order
+        with ThreadPoolExecutor(max_workers=len(examples)) as executor:
+            results = list(executor.map(lambda example: search_companies(**example[1], verbose=False), examples))
+        for (title, params), result in zip(examples, results):
+            print("\n" + title)
+            _print_search_header(**params)
+            display_search_results(result)
+
+def _run_cli_search(spec, defaults):
+    """
+    Run one CLI search; spec holds per-query overrides (query, top_k, filters)
+    """
+    params = {**defaults, **spec}
+    industry_filter, location_filter, revenue_filter, employees_filter = parse_filter_params(
+        industry_list=params.get('industry'),
+        location_list=params.get('location'),
+        revenue_min=params.get('revenue_min'),
+        revenue_max=params.get('revenue_max'),
+        employees_min=params.get('employees_min'),
+        employees_max=params.get('employees_max'),
+    )
+    return get_top_k_companies(
+        params['query'],
+        top_k=int(params.get('top_k') or 5),
+        industry_filter=industry_filter,
+        location_filter=location_filter,
+        revenue_filter=revenue_filter,
+        employees_filter=employees_filter,
+        with_reasoning=bool(params.get('with_reasoning')),
+        index_name=params.get('index_name') or 'company-information-dummy',
+        infer_filters=bool(params.get('infer_filters')),
+    )
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    With --query, runs one search and prints the result as JSON. With
+    --batch FILE, reads one search per line (a JSON object with a "query"
+    key and optional overrides such as "top_k" or "industry", or a bare
+    query string), runs them concurrently and prints one JSON result per
+    line. Without either, falls back to the interactive menu.
+    """
+    parser = argparse.ArgumentParser(description='Semantic company search')
+    parser.add_argument('--query', help='search query text')
+    parser.add_argument('--batch', metavar='FILE', help='JSONL file of searches to run concurrently')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--industry', help='comma-separated industries')
+    parser.add_argument('--location', help='comma-separated locations')
+    parser.add_argument('--revenue-min')
+    parser.add_argument('--revenue-max')
+    parser.add_argument('--employees-min')
+    parser.add_argument('--employees-max')
+    parser.add_argument('--with-reasoning', action='store_true')
+    parser.add_argument('--infer-filters', action='store_true', help='filter on industries/locations named in the query')
+    parser.add_argument('--index-name', default='company-information-dummy')
+    parser.add_argument('--workers', type=int, default=16, help='concurrent searches in --batch mode')
+    args = parser.parse_args(argv)
+
+    if not args.query and not args.batch:
+        legacy_repl()
+        return
+
+    defaults = {
+        'top_k': args.top_k,
+        'industry': args.industry,
+        'location': args.location,
+        'revenue_min': args.revenue_min,
+        'revenue_max': args.revenue_max,
+        'employees_min': args.employees_min,
+        'employees_max': args.employees_max,
+        'with_reasoning': args.with_reasoning,
+        'infer_filters': args.infer_filters,
+        'index_name': args.index_name,
+    }
+
+    if args.query:
+        _write_jsonl([_run_cli_search({'query': args.query}, defaults)])
+        return
+
+    with open(args.batch, 'rb') as f:
+        specs = [orjson.loads(line) for line in f if line.strip()]
+    specs = [spec if isinstance(spec, dict) else {'query': spec} for spec in specs]
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        _write_jsonl(executor.map(lambda spec: _run_cli_search(spec, defaults), specs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Revenue parsing shared by the ingest and search modules. Kept free of heavy
+imports so the search process doesn't load the ingest stack to use it.
+"""
+import functools
+import math
+from typing import Any, Optional
+
+_REVENUE_SUFFIXES = {'K': 1e3, 'M': 1e6, 'B': 1e9, 'T': 1e12}
+
+def parse_revenue(revenue: Any) -> Optional[float]:
+    """
+    Convert a revenue value such as "$106M", "1.2B" or 5000000 to a number.
+    Returns None when the value is missing or can't be parsed (e.g. "N/A").
+    """
+    if revenue is None or isinstance(revenue, bool):
+        return None
+    if isinstance(revenue, (int, float)):
+        return float(revenue) if revenue == revenue else None
+    return _parse_revenue_text(str(revenue))
+
+# Revenue strings repeat heavily across records ("$50M", "$1B"), so parse each once
+@functools.lru_cache(maxsize=4096)
+def _parse_revenue_text(revenue: str) -> Optional[float]:
+    text = revenue.strip().upper().replace('$', '').replace(',', '')
+    multiplier = 1.0
+    if text and text[-1] in _REVENUE_SUFFIXES:
+        multiplier = _REVENUE_SUFFIXES[text[-1]]
+        text = text[:-1]
+    try:
+        value = float(text) * multiplier
+    except ValueError:
+        return None
+    # "nan"/"inf" parse as floats but aren't revenues
+    return value if math.isfinite(value) else None
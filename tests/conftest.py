@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The RAG modules build their OpenAI/Pinecone clients at import; these tests never call them
+os.environ.setdefault('OPENAI_API_KEY', 'test-key')
+os.environ.setdefault('PINECONE_API_KEY', 'test-key')
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
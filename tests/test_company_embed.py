@@ -0,0 +1,93 @@
+import asyncio
+import io
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from RAG import company_embed
+
+# NaN text cells, empty list cells, a missing employee count and stray whitespace
+CSV = b'''company_name,industry,headquarters,revenue,employees,business_model,strategic_priorities,ideal_op_industry,ideal_op_functional,ideal_op_leadership,extra
+Acme,Tech,"New York, NY",$106M,120,SaaS,"growth, M&A ,  expansion",Tech,"sales,ops",
+Beta,,Austin,1.50,,B2B,,,"",leadership
+Caf\xc3\xa9,Food,Paris,1.5B,7,Retail,"  one  ",Food,finance,"l1, l2"
+'''
+
+# Every revenue looks numeric, so a type-inferring reader would turn "1.50" into 1.5
+NUMERIC_REVENUE_CSV = b'''company_name,industry,headquarters,revenue,employees,business_model,strategic_priorities,ideal_op_industry,ideal_op_functional,ideal_op_leadership
+Gamma,Tech,Boston,1.50,12,SaaS,growth,Tech,sales,vision
+Delta,Retail,Denver,100,,B2C,"",Retail,,
+'''
+
+
+def _descriptions_match(records):
+    records = list(records)
+    assert len(records) == 3
+    for record in records:
+        description = record.pop('description')
+        assert description == company_embed.create_company_description(record)
+
+
+def test_pandas_csv_descriptions_match_create_company_description():
+    _descriptions_match(company_embed._iter_companies_pandas(io.BytesIO(CSV), chunksize=2))
+
+
+@pytest.mark.skipif(company_embed.pl is None, reason='polars not installed')
+def test_polars_csv_descriptions_match_create_company_description():
+    _descriptions_match(company_embed._iter_companies_polars(io.BytesIO(CSV)))
+
+
+def test_csv_records_keep_text_verbatim_and_default_employees():
+    acme, beta, _ = company_embed._iter_companies_pandas(io.BytesIO(CSV), chunksize=10)
+    assert acme['deal_analysis']['strategic_priorities'] == ['growth', 'M&A', 'expansion']
+    assert acme['deal_analysis']['ideal_op_profile']['leadership'] == []
+    assert beta['basic_info']['industry'] is None
+    assert beta['basic_info']['revenue'] == '1.50'
+    assert beta['basic_info']['employees'] == 0
+    assert beta['deal_analysis']['ideal_op_profile']['functional'] == []
+
+
+@pytest.mark.skipif(company_embed.pl is None, reason='polars not installed')
+@pytest.mark.parametrize('csv', [CSV, NUMERIC_REVENUE_CSV], ids=['mixed', 'numeric-revenue'])
+def test_polars_and_pandas_csv_records_are_identical(csv):
+    from_pandas = list(company_embed._iter_companies_pandas(io.BytesIO(csv), chunksize=10))
+    from_polars = list(company_embed._iter_companies_polars(io.BytesIO(csv)))
+    assert from_polars == from_pandas
+    assert from_pandas[0]['basic_info']['revenue'] in ('$106M', '1.50')
+
+
+def test_unparseable_revenue_is_left_out_of_metadata():
+    company = {
+        'company_name': 'Acme',
+        'basic_info': {'industry': 'Tech', 'headquarters': 'NY', 'revenue': 'N/A', 'employees': 5},
+        'deal_analysis': {
+            'business_model': 'SaaS', 'strategic_priorities': [],
+            'ideal_op_profile': {'industry': 'Tech', 'functional': [], 'leadership': []},
+        },
+    }
+    assert 'revenue_numeric' not in company_embed._build_vector_record('id', company, [0.0])['metadata']
+    company['basic_info']['revenue'] = '$106M'
+    assert company_embed._build_vector_record('id', company, [0.0])['metadata']['revenue_numeric'] == 106e6
+
+
+class _StubAsyncEmbeddings:
+    """Embeds each text as [len(text)] and rejects any request containing a "bad" text"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, input, model, dimensions):
+        self.calls.append(list(input))
+        if any(text.startswith('bad') for text in input):
+            response = SimpleNamespace(request=None, status_code=400, headers={})
+            raise openai.BadRequestError('invalid input', response=response, body=None)
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=[float(len(t))]) for i, t in enumerate(input)])
+
+
+def test_bad_input_only_fails_its_own_embedding():
+    aclient = SimpleNamespace(embeddings=_StubAsyncEmbeddings())
+    texts = ['a', 'bb', 'bad', 'dddd', 'eeeee']
+    embeddings = asyncio.run(company_embed._request_embeddings(aclient, texts, asyncio.Semaphore(2)))
+    assert embeddings == [[1.0], [2.0], None, [4.0], [5.0]]
+    assert ['bad'] in aclient.embeddings.calls
@@ -0,0 +1,245 @@
+import io
+import random
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import openai
+import pytest
+
+from RAG import company_search
+
+
+def _snapshot(seed=7, size=300):
+    rng = random.Random(seed)
+    index = company_search.MetadataIndex()
+    for i in range(size):
+        metadata = {
+            'industry': rng.choice(['EdTech', 'SaaS', 'Logistics']),
+            'headquarters': rng.choice(['NY', 'CA']),
+            'employees': rng.choice([0, 5, 10, 49, 50, 120, 250, 999, 1_000, 7_500, 20_000]),
+            'revenue_numeric': rng.choice([0.0, 5e5, 1e6, 3e7, 1e8, 4.2e8, 1e9, 2e10]),
+        }
+        if i % 25 == 0:
+            del metadata['employees']
+        index.add(str(i), metadata)
+    return index
+
+
+def _brute_force(index, filter_dict):
+    preds = {field: company_search._compile_condition(cond) for field, cond in filter_dict.items()}
+    return {i for i, md in index.metadata.items() if all(p(md.get(f)) for f, p in preds.items())}
+
+
+RANGE_FILTERS = [
+    {'employees': {'$gte': 50}},
+    {'employees': {'$gt': 50}},
+    {'employees': {'$lte': 250}},
+    {'employees': {'$lt': 10}},
+    {'employees': {'$gte': 100, '$lte': 1_000}},
+    {'employees': {'$eq': 120}},
+    {'employees': 1_000},
+    {'employees': {'$gte': 37, '$lte': 3_000}},
+    {'revenue_numeric': {'$gte': 1e8}},
+    {'revenue_numeric': {'$gte': 1e6, '$lte': 5e8}},
+    {'employees': {'$gte': 50}, 'revenue_numeric': {'$lte': 1e9}},
+]
+
+
+@pytest.mark.parametrize('filter_dict', RANGE_FILTERS)
+def test_signature_prefilter_never_drops_matches(filter_dict):
+    index = _snapshot()
+    expected = _brute_force(index, filter_dict)
+    signature_hits = index._signature_matches(filter_dict)
+    assert signature_hits is not None
+    assert expected <= signature_hits
+    assert index.candidates(filter_dict) == expected
+
+
+def test_signature_prefilter_combines_with_postings():
+    index = _snapshot()
+    filter_dict = {'industry': {'$in': ['SaaS']}, 'revenue_numeric': {'$gte': 1e8}}
+    assert index.candidates(filter_dict) == _brute_force(index, filter_dict)
+
+
+def test_revenue_filter_reaches_signature_path():
+    index = _snapshot()
+    filter_dict, applied = company_search._build_filter(
+        *company_search.parse_filter_params(revenue_min='$100M', revenue_max='1B')
+    )
+    assert filter_dict == {'revenue_numeric': {'$gte': 1e8, '$lte': 1e9}}
+    assert applied == {'revenue': {'$gte': '$100M', '$lte': '1B'}}
+    assert index._signature_matches(filter_dict) is not None
+    assert index.candidates(filter_dict) == _brute_force(index, filter_dict)
+
+
+@pytest.mark.parametrize('bounds', [{'revenue_min': 'abc'}, {'revenue_max': 'N/A'}, {'revenue_min': '$1M', 'revenue_max': 'lots'}])
+def test_invalid_revenue_bounds_are_ignored(bounds):
+    revenue_filter = company_search.parse_filter_params(**bounds)[2]
+    assert revenue_filter is None
+    assert company_search._build_filter(revenue_filter={'$gte': 'abc'}) == (None, {})
+
+
+
+def _unit(i, dimension=4):
+    vec = np.zeros(dimension, dtype=np.float32)
+    vec[i] = 1.0
+    return vec
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(company_search, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_semantic_cache_reuses_expired_slots(clock):
+    cache = company_search.SemanticQueryCache(capacity=2, dimension=4, ttl=10)
+    cache.put(_unit(0), 'k', 'a')
+    clock[0] = 5
+    cache.put(_unit(1), 'k', 'b')
+    clock[0] = 12
+    assert cache.get(_unit(0), 'k') is None  # expired, frees its slot
+    cache.put(_unit(2), 'k', 'c')
+    assert cache.get(_unit(1), 'k') == 'b'
+    assert cache.get(_unit(2), 'k') == 'c'
+
+
+def test_semantic_cache_evicts_least_recently_used(clock):
+    cache = company_search.SemanticQueryCache(capacity=2, dimension=4, ttl=10)
+    cache.put(_unit(0), 'k', 'a')
+    cache.put(_unit(1), 'k', 'b')
+    assert cache.get(_unit(0), 'k') == 'a'
+    cache.put(_unit(2), 'k', 'c')
+    assert cache.get(_unit(1), 'k') is None
+    assert (cache.get(_unit(0), 'k'), cache.get(_unit(2), 'k')) == ('a', 'c')
+
+
+def test_semantic_cache_requires_matching_params(clock):
+    cache = company_search.SemanticQueryCache(capacity=4, dimension=4, threshold=0.95)
+    near = _unit(0) + 0.1 * _unit(1)
+    cache.put(_unit(0), 'top5', 'exact')
+    assert cache.get(near, 'top10') is None
+    cache.put(near, 'top10', 'near')
+    assert cache.get(_unit(0), 'top10') == 'near'
+    assert cache.get(near, 'top5') == 'exact'
+
+
+def _bad_request(message):
+    response = SimpleNamespace(request=None, status_code=400, headers={})
+    return openai.BadRequestError(message, response=response, body=None)
+
+
+class _StubEmbeddings:
+    """Embeds each text as [len(text)], returning the data out of order"""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    def create(self, input, model, dimensions):
+        self.calls.append(list(input))
+        if self.error is not None:
+            raise self.error
+        if any(text.startswith('bad') for text in input):
+            raise _bad_request('invalid input')
+        data = [SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=data[::-1])
+
+
+def _embed_concurrently(batcher, texts):
+    with ThreadPoolExecutor(max_workers=len(texts)) as executor:
+        futures = [executor.submit(batcher.embed, text) for text in texts]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def test_embedding_batcher_matches_results_to_callers_by_index():
+    embeddings = _StubEmbeddings()
+    batcher = company_search.EmbeddingBatcher(max_batch=3, max_wait=5, embeddings=embeddings)
+    assert _embed_concurrently(batcher, ['a', 'bb', 'ccc']) == [[1.0], [2.0], [3.0]]
+    assert len(embeddings.calls) == 1
+
+
+def test_embedding_batcher_isolates_a_bad_input():
+    embeddings = _StubEmbeddings()
+    batcher = company_search.EmbeddingBatcher(max_batch=3, max_wait=5, embeddings=embeddings)
+    ok, bad, also_ok = _embed_concurrently(batcher, ['a', 'bad', 'ccc'])
+    assert (ok, also_ok) == ([1.0], [3.0])
+    assert isinstance(bad, openai.BadRequestError)
+
+
+def test_embedding_batcher_fails_whole_batch_on_transient_errors():
+    embeddings = _StubEmbeddings(error=ConnectionError('down'))
+    batcher = company_search.EmbeddingBatcher(max_batch=3, max_wait=5, embeddings=embeddings)
+    results = _embed_concurrently(batcher, ['a', 'bb', 'ccc'])
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert len(embeddings.calls) == 1
+
+
+def test_generate_embedding_returns_shared_read_only_array(monkeypatch):
+    embeddings = _StubEmbeddings()
+    monkeypatch.setattr(company_search, '_embedding_batcher', company_search.EmbeddingBatcher(embeddings=embeddings))
+    company_search._embed_cached.cache_clear()
+    first = company_search.generate_embedding('  Fast   Growing SaaS ')
+    second = company_search.generate_embedding('fast growing saas')
+    assert second is first
+    assert first.dtype == np.float32 and not first.flags.writeable
+    assert len(embeddings.calls) == 1
+
+
+def _match(name, score):
+    metadata = {
+        'company_name': name, 'industry': 'SaaS', 'headquarters': 'NY', 'revenue': '$10M', 'employees': 50,
+        'business_model': 'B2B', 'strategic_priorities': ['growth'], 'ideal_op_industry': 'SaaS',
+        'ideal_op_functional': ['sales'], 'ideal_op_leadership': ['vision'],
+    }
+    return {'id': name, 'score': score, 'metadata': metadata}
+
+
+@pytest.fixture
+def stub_search(monkeypatch):
+    calls = {'search': 0, 'reasoning': 0}
+
+    def search_core(query_embedding, top_k, filter_dict, index_name):
+        calls['search'] += 1
+        return {'matches': [_match('Acme', 0.9), _match('Beta', 0.8)][:top_k]}
+
+    monkeypatch.setattr(company_search, 'generate_embedding', lambda text: np.ones(company_search.EMBEDDING_DIMENSIONS, dtype=np.float32))
+    monkeypatch.setattr(company_search, '_search_core', search_core)
+    company_search.clear_search_caches()
+    yield calls
+    company_search.clear_search_caches()
+
+
+def test_cached_results_cannot_be_mutated_by_callers(stub_search):
+    first = company_search.get_top_k_companies('saas', top_k=2)
+    first['companies'][0]['company_name'] = 'changed'
+    first['companies'].clear()
+    second = company_search.get_top_k_companies('saas', top_k=2)
+    assert [c['company_name'] for c in second['companies']] == ['Acme', 'Beta']
+    assert stub_search['search'] == 1
+
+
+def test_fallback_reasoning_is_not_cached(stub_search, monkeypatch):
+    def failing_reasoning(query, metadata, score):
+        stub_search['reasoning'] += 1
+        return f"Selected based on semantic similarity (score: {score:.3f}). Error generating detailed reasoning: timeout"
+
+    monkeypatch.setattr(company_search, 'generate_company_reasoning', failing_reasoning)
+    company_search.get_top_k_companies('saas', top_k=1, with_reasoning=True)
+    company_search.get_top_k_companies('saas', top_k=1, with_reasoning=True)
+    assert stub_search == {'search': 2, 'reasoning': 2}
+
+
+def test_write_jsonl_falls_back_to_text_stdout(monkeypatch):
+    out = io.StringIO()
+    monkeypatch.setattr(company_search.sys, 'stdout', out)
+    company_search._write_jsonl([{'a': 1}, {'b': 'é'}])
+    assert out.getvalue() == '{"a":1}\n{"b":"é"}\n'
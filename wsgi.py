@@ -0,0 +1,25 @@
+"""
+WSGI entry point for the company search API.
+
+Run with gunicorn using gevent workers (the handlers are I/O-bound on OpenAI
+and Pinecone calls, so cooperative workers serve requests concurrently):
+
+    gunicorn -k gevent -w $(nproc) -b 0.0.0.0:$PORT --worker-connections 1000 wsgi:app
+
+Pinecone is reached over gRPC, whose C core only yields to other greenlets once
+grpc.experimental.gevent.init_gevent() has run; without it every query, fetch
+and upsert blocks the whole worker. It must run before the RAG modules create
+their clients, so it is done here when the worker has monkey-patched sockets.
+"""
+try:
+    from gevent import monkey
+except ImportError:  # gevent is only needed for the gevent worker
+    monkey = None
+
+if monkey is not None and monkey.is_module_patched('socket'):
+    from grpc.experimental import gevent as grpc_gevent
+    grpc_gevent.init_gevent()
+
+from RAG.api import app
+
+__all__ = ['app']